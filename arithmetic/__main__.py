@@ -1,11 +1,29 @@
+import os
+import shutil
+
 import uvicorn
 
 from arithmetic.gunicorn_runner import GunicornApplication
 from arithmetic.settings import settings
 
 
+def set_multiproc_dir() -> None:
+    """
+    Sets the directory where the workers share their metrics.
+
+    It has to happen before prometheus_client is imported by any process,
+    and the files left by a previous run are removed.
+    """
+    shutil.rmtree(settings.prometheus_dir, ignore_errors=True)
+    settings.prometheus_dir.mkdir(parents=True, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(
+        settings.prometheus_dir.expanduser().absolute(),
+    )
+
+
 def main() -> None:
     """Entrypoint of the application."""
+    set_multiproc_dir()
     if settings.reload:
         uvicorn.run(
             "arithmetic.web.application:get_app",
@@ -0,0 +1,83 @@
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from arithmetic.db.models.operation_model import OperationModel
+from arithmetic.settings import settings
+
+
+class OperationCatalog:
+    """
+    Process-wide in-memory copy of the operations table.
+
+    Operations and their costs almost never change, so they are loaded once
+    and served from memory until the TTL expires or the catalog is invalidated.
+    Entries are keyed by operation type, which are the values of
+    OperationEnum, and are transient models detached from any session.
+
+    The catalog is reloaded in a session of its own, so rows a request has
+    not committed yet never reach it, and an unknown type stays unknown
+    until the TTL expires rather than reloading the catalog on every lookup.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.operations: Dict[str, OperationModel] = {}
+        self.loaded_at: Optional[float] = None
+
+    def is_fresh(self) -> bool:
+        """Checks whether the catalog was loaded and has not expired yet."""
+        return (
+            self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+        )
+
+    async def load(self, session: AsyncSession) -> None:
+        """
+        Load every known operation from the database.
+
+        :param session: session used to query the operations table.
+        """
+        rows = await session.execute(
+            select(
+                OperationModel.id,
+                OperationModel.operation_type,
+                OperationModel.cost,
+            ),
+        )
+        operations: Dict[str, OperationModel] = {}
+        for operation_id, operation_type, cost in rows:
+            operations[operation_type] = OperationModel(
+                id=operation_id,
+                operation_type=operation_type,
+                cost=cost,
+            )
+        self.operations = operations
+        self.loaded_at = time.monotonic()
+
+    async def get(
+        self,
+        session: AsyncSession,
+        type: str,
+    ) -> Optional[OperationModel]:
+        """
+        Get an operation, reloading the catalog when it is stale.
+
+        :param session: session of the caller, whose connection source is
+            used to reload the catalog.
+        :param type: type of the operation.
+        :return: the cached operation, None if it doesn't exist.
+        """
+        if not self.is_fresh():
+            async with AsyncSession(session.bind) as catalog_session:
+                await self.load(catalog_session)
+        return self.operations.get(type)
+
+    def invalidate(self) -> None:
+        """Drop every cached operation so the next lookup hits the database."""
+        self.operations = {}
+        self.loaded_at = None
+
+
+operation_catalog = OperationCatalog(ttl=settings.operation_catalog_ttl)
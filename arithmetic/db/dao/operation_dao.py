@@ -1,10 +1,10 @@
 from typing import List
 
 from fastapi import Depends
-from sqlalchemy import select
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from arithmetic.db.dao.operation_catalog import operation_catalog
 from arithmetic.db.dependencies import get_db_session
 from arithmetic.db.models.operation_model import OperationModel
 
@@ -19,11 +19,21 @@ class OperationDAO:
         """
         Add a new operation.
 
+        The operation catalog is invalidated once the session commits,
+        so the catalog never holds an operation that may be rolled back.
+
         :param operation_type: type of the operation.
         :param cost: cost of the operation.
         """
         new_operation = OperationModel(operation_type=operation_type, cost=cost)
         self.session.add(new_operation)
+        await self.session.flush()
+        event.listen(
+            self.session.sync_session,
+            "after_commit",
+            lambda _: operation_catalog.invalidate(),
+            once=True,
+        )
 
     async def get_all_operations(self) -> List[OperationModel]:
         """
@@ -39,16 +49,13 @@ class OperationDAO:
         """
         Get a single operation model by its type.
 
+        Operations are served from the process-wide catalog, so this only
+        touches the database when the catalog is stale.
+
         :param type: type of the operation.
-        :return: OperationModel instance if found, None otherwise.
+        :return: OperationModel instance if found.
         """
-        try:
-            query = select(OperationModel).where(
-                OperationModel.operation_type == type,
-            )
-            result = await self.session.execute(query)
-            return result.scalar_one()
-        except NoResultFound as err:
-            raise Exception(f"Invalid Type {type}") from err
-        except Exception as e:
-            raise e
+        operation = await operation_catalog.get(self.session, type)
+        if operation is None:
+            raise Exception(f"Invalid Type {type}")
+        return operation
@@ -1,12 +1,28 @@
-from typing import List
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
 
 from fastapi import Depends
-from sqlalchemy import func, not_, select
+from sqlalchemy import Row, func, not_, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from arithmetic.db.dao.record_response import RecordResponse
+from arithmetic.db.dao.record_response import CountMode, RecordResponse
 from arithmetic.db.dependencies import get_db_session
 from arithmetic.db.models.record_model import RecordModel
+from arithmetic.db.models.user_model import UserModel
+
+# Columns of RecordDTO, read as plain rows without loading ORM entities.
+# The date is formatted by the database, and the raw timestamp is kept
+# for the keyset pagination cursor.
+LISTING_COLUMNS = (
+    RecordModel.id,
+    RecordModel.user_id,
+    RecordModel.amount,
+    RecordModel.user_balance,
+    RecordModel.operation_response,
+    RecordModel.operation_text,
+    func.to_char(RecordModel.date, "YYYY-MM-DD").label("date"),
+    RecordModel.date.label("timestamp"),
+)
 
 
 class RecordDAO:
@@ -15,80 +31,169 @@ class RecordDAO:
     def __init__(self, session: AsyncSession = Depends(get_db_session)) -> None:
         self.session = session
 
-    async def create_record(self, record: RecordModel) -> None:
+    async def create_records(self, records: List[RecordModel]) -> None:
         """
-        Add single record to session.
+        Add several records to session and commit them.
 
-        :param record: record to be saved.
+        They are flushed together, as a single multi-row insert.
+
+        :param records: records to be saved.
+        """
+        await self.add_records(records)
+        await self.session.commit()
+
+    async def add_records(self, records: List[RecordModel]) -> None:
+        """
+        Add several records to session, without committing them.
+
+        :param records: records to be saved.
+        """
+        self.session.add_all(records)
+
+    async def stream_records(
+        self,
+        user_id: int,
+        batch_size: int,
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """
+        Stream every non deleted record of a user, newest first.
+
+        Rows are read through a server-side cursor, batch_size at a time,
+        so memory use doesn't depend on how many records the user has.
+
+        :param user_id: id of the user.
+        :param batch_size: rows fetched per round trip.
+        :yield: batches of rows with the columns of RecordDTO.
         """
-        self.session.add(record)
+        query = (
+            select(
+                RecordModel.id,
+                RecordModel.user_id,
+                RecordModel.amount,
+                RecordModel.user_balance,
+                RecordModel.operation_response,
+                RecordModel.operation_text,
+                RecordModel.date,
+            )
+            .where(RecordModel.user_id == user_id, not_(RecordModel.deleted))
+            .order_by(RecordModel.date.desc(), RecordModel.id.desc())
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(query)
+        async for rows in result.partitions():
+            yield rows
 
     async def get_all_records(
         self,
         user_id: int,
         limit: int,
         offset: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        count: CountMode = CountMode.EXACT,
     ) -> RecordResponse:
         """
-        Returns all records.
+        Returns all records, newest first.
+
+        Records are ordered by (date, id), so pages are stable. When `after`
+        is given the page starts right after that position and the offset is
+        ignored, which costs the same no matter how deep the page is.
 
         :param user_id: id of the user.
         :param limit: limit of records.
         :param offset: offset of records.
-        :return: stream of records.
+        :param after: date and id of the last record of the previous page.
+        :param count: how the total count is computed.
+        :return: rows with the LISTING_COLUMNS of the records.
         """
+        total_count = await self.count_records(user_id, count)
 
-        total_records = await self.session.execute(
-            select(func.count(RecordModel.id))
-            .where((RecordModel.user_id == user_id))
-            .filter(not_(RecordModel.deleted)),
-        )
-        total_count = total_records.scalar() or 0
-
-        records = await self.session.execute(
-            select(RecordModel)
+        query = (
+            select(*LISTING_COLUMNS)
             .where((RecordModel.user_id == user_id))
             .filter(not_(RecordModel.deleted))
+            .order_by(RecordModel.date.desc(), RecordModel.id.desc())
             .limit(limit)
-            .offset(offset),
         )
+        if after is None:
+            query = query.offset(offset)
+        else:
+            query = query.where(tuple_(RecordModel.date, RecordModel.id) < after)
+        records = await self.session.execute(query)
 
-        return RecordResponse(
-            records=list(records.scalars().fetchall()),
-            total_count=total_count,
-        )
+        return RecordResponse(records=records.all(), total_count=total_count)
+
+    async def count_records(self, user_id: int, count: CountMode) -> Optional[int]:
+        """
+        Count the records of a user.
+
+        :param user_id: id of the user.
+        :param count: how the count is computed.
+        :return: number of records, None if count is CountMode.NONE.
+        """
+        if count == CountMode.NONE:
+            return None
+        if count == CountMode.ESTIMATE:
+            query = select(UserModel.record_count).where(UserModel.id == user_id)
+        else:
+            query = (
+                select(func.count(RecordModel.id))
+                .where((RecordModel.user_id == user_id))
+                .filter(not_(RecordModel.deleted))
+            )
+        total_records = await self.session.execute(query)
+        return total_records.scalar() or 0
 
     async def delete_record(self, record_id: int) -> None:
         """
-        Soft deletes a record by setting its deleted_at field to the current timestamp.
+        Soft deletes a record by setting its deleted field.
+
+        The record counter of its user is decremented in the same statement.
 
         :param record_id: id of the record.
         """
-        record = await self.session.get(RecordModel, record_id)
-        if record:
-            record.deleted = True
-            await self.session.commit()
+        deleted = (
+            update(RecordModel)
+            .where(RecordModel.id == record_id, not_(RecordModel.deleted))
+            .values(deleted=True)
+            .returning(RecordModel.user_id)
+            .cte("deleted")
+        )
+        await self.session.execute(
+            update(UserModel)
+            .where(UserModel.id == deleted.c.user_id)
+            .values(record_count=UserModel.record_count - 1)
+            .execution_options(synchronize_session=False),
+        )
+        await self.session.commit()
 
     async def search(
         self,
+        user_id: int,
         term: str,
         limit: int,
         offset: int,
-    ) -> List[RecordModel]:
+    ) -> Sequence[Row[Any]]:
         """
-        Search records by term.
+        Search records of a user by term.
 
+        The term is matched literally anywhere in the operation text.
+        Such LIKE '%term%' filters are served by the trigram index
+        on operation_text instead of scanning the whole table.
+
+        :param user_id: id of the user.
         :param term: search term.
         :param limit: limit of records.
         :param offset: offset of records.
-        :return: stream of records.
+        :return: rows with the LISTING_COLUMNS of the records.
         """
         records = await self.session.execute(
-            select(RecordModel)
-            .where(RecordModel.operation_text.like(f"%{term}%"))
+            select(*LISTING_COLUMNS)
+            .where(RecordModel.user_id == user_id)
+            .where(RecordModel.operation_text.contains(term, autoescape=True))
             .filter(not_(RecordModel.deleted))
+            .order_by(RecordModel.date.desc(), RecordModel.id.desc())
             .limit(limit)
             .offset(offset),
         )
 
-        return list(records.scalars().fetchall())
+        return records.all()
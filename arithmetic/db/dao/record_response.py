@@ -1,11 +1,27 @@
-from typing import List
+import enum
+from typing import Any, Optional, Sequence
 
-from arithmetic.db.models.record_model import RecordModel
+from sqlalchemy import Row
+
+
+class CountMode(str, enum.Enum):
+    """Ways of computing the total count of a record listing."""
+
+    # count(*) over the records of the user
+    EXACT = "exact"
+    # counter maintained on the user with every record write
+    ESTIMATE = "estimate"
+    # no count at all
+    NONE = "none"
 
 
 class RecordResponse:
     """Represents a return object to include the total count for pagination purposes."""
 
-    def __init__(self, records: List[RecordModel], total_count: int) -> None:
+    def __init__(
+        self,
+        records: Sequence[Row[Any]],
+        total_count: Optional[int],
+    ) -> None:
         self.records = records
         self.total_count = total_count
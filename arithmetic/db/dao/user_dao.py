@@ -1,7 +1,7 @@
 from typing import Optional
 
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,17 +15,70 @@ class UserDAO:
     def __init__(self, session: AsyncSession = Depends(get_db_session)) -> None:
         self.session = session
 
-    async def update_user_balance(self, user_id: int, balance: int) -> None:
+    async def debit_balance(
+        self,
+        user_id: int,
+        amount: int,
+        records: int = 1,
+    ) -> Optional[int]:
         """
-        Update the balance of a user.
+        Subtract an amount from the balance of a user in a single statement.
+
+        The balance is only debited if it covers the amount, so concurrent
+        debits can never take it below zero. The same statement counts the
+        records the amount pays for. The change is not committed.
+
+        :param user_id: ID of the user.
+        :param amount: amount to be subtracted.
+        :param records: number of records being paid for.
+        :return: the new balance, None if the user can't afford the amount.
+        """
+        result = await self.session.execute(
+            update(UserModel)
+            .where(UserModel.id == user_id, UserModel.balance >= amount)
+            .values(
+                balance=UserModel.balance - amount,
+                record_count=UserModel.record_count + records,
+            )
+            .returning(UserModel.balance),
+        )
+        return result.scalar_one_or_none()
+
+    async def credit_balance(
+        self,
+        user_id: int,
+        amount: int,
+        records: int = 1,
+    ) -> None:
+        """
+        Give back an amount debited for records that were never saved.
+
+        The change is not committed.
+
+        :param user_id: ID of the user.
+        :param amount: amount to be given back.
+        :param records: number of records that were paid for.
+        """
+        await self.session.execute(
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(
+                balance=UserModel.balance + amount,
+                record_count=UserModel.record_count - records,
+            ),
+        )
+
+    async def get_balance(self, user_id: int) -> Optional[int]:
+        """
+        Get the balance of a user.
 
         :param user_id: ID of the user.
-        :param new_balance: New balance to be set for the user.
+        :return: the balance, None if the user doesn't exist.
         """
-        user = await self.get_user_by_id(user_id)
-        if user:
-            user.balance = balance
-            await self.session.commit()
+        result = await self.session.execute(
+            select(UserModel.balance).where(UserModel.id == user_id),
+        )
+        return result.scalar_one_or_none()
 
     async def create_user(self, username: str, password: str) -> None:
         """
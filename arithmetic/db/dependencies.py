@@ -1,8 +1,11 @@
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from starlette.requests import Request
 
+from arithmetic.db.engine import InstrumentedPool
+
 
 async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
@@ -18,3 +21,54 @@ async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]
     finally:
         await session.commit()
         await session.close()
+
+
+async def get_db_read_session(
+    request: Request,
+    session: AsyncSession = Depends(get_db_session),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Create and get a database session for read-only work.
+
+    The session reads from a read replica when replicas are configured
+    and one of them is fresh enough and reachable. Otherwise it is the
+    session of the request, so a request never holds two connections
+    to the primary. Nothing is committed, so it must not be used to write.
+
+    :param request: current request.
+    :param session: database session of the request.
+    :yield: database session.
+    """
+    router = getattr(request.app.state, "db_replica_router", None)
+    read_session = None if router is None else await router.read_session()
+    if read_session is None:
+        yield session
+        return
+
+    try:
+        yield read_session
+    finally:
+        await read_session.close()
+
+
+def get_db_session_factory(request: Request) -> async_sessionmaker[AsyncSession]:
+    """
+    Get the database session factory.
+
+    Used where a session has to outlive the dependencies of the request,
+    such as a streaming response, which is sent after they are closed.
+
+    :param request: current request.
+    :return: database session factory.
+    """
+    return request.app.state.db_session_factory
+
+
+def get_db_pool(request: Request) -> InstrumentedPool:
+    """
+    Get the connection pool of the database engine.
+
+    :param request: current request.
+    :return: connection pool.
+    """
+    return request.app.state.db_engine.pool
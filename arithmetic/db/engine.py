@@ -0,0 +1,180 @@
+import asyncio
+import re
+import time
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from typing import Any
+
+from prometheus_client import Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+from arithmetic.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_DURATION,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAITING,
+    DB_QUERY_DURATION,
+)
+from arithmetic.settings import settings
+from arithmetic.timing import record_timing
+
+# First table a statement reads from, inserts into or updates
+STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+\"?(\w+)", re.IGNORECASE)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that keeps statistics of its checkouts.
+
+    Besides the size, overflow and checked out connections the pool
+    already knows, it counts the checkouts in progress, which wait for a
+    connection to be returned or for a new one to be opened, how long they
+    took and how many gave up after the pool timeout. A growing number of
+    waiting checkouts or timeouts means the pool is starved.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        # Seconds spent by checkouts, in total and by the slowest one
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def max_overflow(self) -> int:
+        """Connections the pool opens beyond its size under load."""
+        return self._max_overflow
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        self.waiting += 1
+        DB_POOL_WAITING.inc()
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            self.waiting -= 1
+            DB_POOL_WAITING.dec()
+            elapsed = time.perf_counter() - start
+            self.wait_time += elapsed
+            self.max_wait_time = max(self.max_wait_time, elapsed)
+            DB_POOL_CHECKOUT_DURATION.observe(elapsed)
+        self.checkouts += 1
+        DB_POOL_CHECKED_OUT.inc()
+        return entry
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        DB_POOL_CHECKED_OUT.dec()
+        super()._do_return_conn(record)
+
+
+@lru_cache(maxsize=1024)
+def _query_duration(statement: str) -> Histogram:
+    """
+    Get the histogram child of a statement.
+
+    Labels are the SQL keyword and the first table of the statement,
+    which stay bounded where the statement text doesn't.
+    Statements are compiled once and cached by SQLAlchemy,
+    so the same strings come back over and over.
+
+    :param statement: SQL of the statement.
+    :return: histogram of its duration.
+    """
+    words = statement.split(None, 1)
+    table = STATEMENT_TABLE.search(statement)
+    return DB_QUERY_DURATION.labels(
+        words[0].upper() if words else "",
+        table.group(1).lower() if table else "",
+    )
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    _cursor: Any,
+    _statement: str,
+    *_args: Any,
+) -> None:
+    # A connection runs one statement at a time
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    _cursor: Any,
+    statement: str,
+    *_args: Any,
+) -> None:
+    start = conn.info.pop("query_start", None)
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        _query_duration(statement).observe(elapsed)
+        record_timing("db", elapsed)
+
+
+def instrument_queries(engine: AsyncEngine) -> None:
+    """
+    Record the duration of every statement executed by an engine.
+
+    :param engine: engine to instrument.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def create_engine(
+    url: str = str(settings.db_url),
+    pool_size: int = settings.db_pool_size,
+    max_overflow: int = settings.db_max_overflow,
+    pool_timeout: float = settings.db_pool_timeout,
+) -> AsyncEngine:
+    """
+    Create the database engine of the application.
+
+    :param url: database URL.
+    :param pool_size: connections kept open in the pool.
+    :param max_overflow: connections opened beyond pool_size under load.
+    :param pool_timeout: seconds a checkout waits for a connection.
+    :return: engine with an instrumented pool and statements.
+    """
+    engine = create_async_engine(
+        url,
+        echo=settings.db_echo,
+        poolclass=InstrumentedPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            # Cache of asyncpg itself, and the one of the SQLAlchemy adapter
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        },
+    )
+    instrument_queries(engine)
+    return engine
+
+
+async def prewarm_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open pool connections ahead of the first requests.
+
+    The connections are opened concurrently and returned to the pool,
+    where they wait for the requests.
+
+    :param engine: engine whose pool is filled.
+    :param connections: number of connections to open.
+    """
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(connections)),
+        )
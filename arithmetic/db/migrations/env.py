@@ -1,5 +1,6 @@
 import asyncio
 from logging.config import fileConfig
+from typing import Any, Optional
 
 from alembic import context
 from sqlalchemy.ext.asyncio.engine import create_async_engine
@@ -25,12 +26,32 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = meta
 
+# Indexes only created by migrations, as they need a postgres extension.
+# Autogenerate finds them in the database but not in the metadata,
+# and must not drop them.
+MIGRATION_ONLY_INDEXES = {"ix_records_operation_text_trgm"}
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
 
+def include_object(
+    object: Any,
+    name: Optional[str],
+    type_: str,
+    reflected: bool,
+    compare_to: Any,
+) -> bool:
+    """
+    Tell autogenerate whether to compare a database object.
+
+    :return: False for the indexes only created by migrations.
+    """
+    return not (type_ == "index" and reflected and name in MIGRATION_ONLY_INDEXES)
+
+
 async def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -46,6 +67,7 @@ async def run_migrations_offline() -> None:
     context.configure(
         url=str(settings.db_url),
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -60,7 +82,11 @@ def do_run_migrations(connection: Connection) -> None:
 
     :param connection: connection to the database.
     """
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,36 @@
+"""Add record counter to users
+
+Revision ID: f040a43ed8d0
+Revises: 45850a941374
+Create Date: 2026-10-18 09:12:41.203518
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f040a43ed8d0"
+down_revision = "45850a941374"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column(
+            "record_count", sa.Integer(), nullable=False, server_default=sa.text("0")
+        ),
+    )
+    op.execute(
+        "UPDATE users SET record_count = ("
+        "SELECT count(*) FROM records "
+        "WHERE records.user_id = users.id AND NOT records.deleted"
+        ")"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "record_count")
@@ -0,0 +1,32 @@
+"""Add trigram index to record operation text
+
+Revision ID: 3c1d8e9a2b47
+Revises: f040a43ed8d0
+Create Date: 2026-10-18 10:05:12.518302
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c1d8e9a2b47"
+down_revision = "f040a43ed8d0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_records_operation_text_trgm",
+        "records",
+        ["operation_text"],
+        postgresql_using="gin",
+        postgresql_ops={"operation_text": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_records_operation_text_trgm", table_name="records")
@@ -0,0 +1,30 @@
+"""Add partial composite index for live records of a user
+
+Revision ID: 5df371840a5a
+Revises: 3c1d8e9a2b47
+Create Date: 2026-10-18 10:48:27.904116
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5df371840a5a"
+down_revision = "3c1d8e9a2b47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_records_user_date_live",
+        "records",
+        ["user_id", sa.text("date DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("NOT deleted"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_records_user_date_live", table_name="records")
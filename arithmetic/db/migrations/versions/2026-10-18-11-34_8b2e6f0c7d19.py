@@ -0,0 +1,24 @@
+"""Add expression operation
+
+Revision ID: 8b2e6f0c7d19
+Revises: 5df371840a5a
+Create Date: 2026-10-18 11:34:12.480215
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "8b2e6f0c7d19"
+down_revision = "5df371840a5a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("INSERT INTO operations (operation_type, cost) VALUES ('expression', 1)")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM operations WHERE operation_type = 'expression'")
@@ -0,0 +1,37 @@
+"""Store operation responses as text
+
+Revision ID: c41f9a7e2d63
+Revises: 8b2e6f0c7d19
+Create Date: 2026-10-18 12:20:41.735108
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c41f9a7e2d63"
+down_revision = "8b2e6f0c7d19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # varchar to text is binary coercible, the table is not rewritten
+    op.alter_column(
+        "records",
+        "operation_response",
+        existing_type=sa.String(length=200),
+        type_=sa.Text(),
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "records",
+        "operation_response",
+        existing_type=sa.Text(),
+        type_=sa.String(length=200),
+        postgresql_using="left(operation_response, 200)",
+    )
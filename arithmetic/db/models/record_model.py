@@ -1,8 +1,8 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, ForeignKey
+from sqlalchemy import Boolean, ForeignKey, Index, not_
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.sql.sqltypes import DateTime, Integer, String
+from sqlalchemy.sql.sqltypes import DateTime, Integer, String, Text
 
 from arithmetic.db.base import Base
 
@@ -25,11 +25,26 @@ class RecordModel(Base):
     )
     amount: Mapped[int] = mapped_column(Integer, nullable=False)
     user_balance: Mapped[int] = mapped_column(Integer, nullable=False)
-    operation_response: Mapped[str] = mapped_column(String(length=200))
+    # Results of operations on large operands take thousands of digits
+    operation_response: Mapped[str] = mapped_column(Text)
     date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Searched through a pg_trgm GIN index, which is created by a migration
+    # since it needs the pg_trgm extension, and kept out of autogenerate
+    # by include_object in migrations/env.py.
     operation_text: Mapped[str] = mapped_column(String(length=200))
 
     # Relationships
     operation = relationship("OperationModel", backref="records")
     user = relationship("UserModel", backref="records")
+
+
+# Serves listings, counts and searches, which only look at the
+# non deleted records of a user, newest first.
+Index(
+    "ix_records_user_date_live",
+    RecordModel.user_id,
+    RecordModel.date.desc(),
+    RecordModel.id.desc(),
+    postgresql_where=not_(RecordModel.deleted),
+)
@@ -23,3 +23,5 @@ class UserModel(Base):
     password: Mapped[str] = mapped_column(String(length=200))
     status: Mapped[str] = mapped_column(String(length=10), default="active")
     balance: Mapped[int] = mapped_column(Integer, default=100)
+    # Number of non deleted records, maintained with every record write
+    record_count: Mapped[int] = mapped_column(Integer, default=0)
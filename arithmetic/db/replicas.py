@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import suppress
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from arithmetic.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary. A replica that replayed
+# everything it received is current even if nothing was written for a
+# while, and a server that isn't in recovery is the primary itself.
+LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END",
+)
+
+# Checks a measured lag is trusted for, it is unknown past them
+LAG_VALID_CHECKS = 3
+
+
+class Replica:
+    """A read replica and the last replication lag measured on it."""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        # None until it is measured, or while the replica is unreachable
+        self.lag: Optional[float] = None
+        # Monotonic time the lag was measured at
+        self.measured_at = 0.0
+        self.reads = 0
+
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions to the read replicas in turn.
+
+    A background task measures the replication lag of every replica each
+    check_interval seconds, giving up on a replica that doesn't answer
+    within an interval. Replicas more than max_lag seconds behind, or whose
+    lag can't be measured or wasn't for a few intervals, are skipped until
+    they catch up, and reads go to the primary when no replica is left.
+    A replica that can't be connected to within an interval between two
+    checks is skipped right away, and its read goes to the primary.
+    """
+
+    def __init__(
+        self,
+        replicas: List[AsyncEngine],
+        max_lag: float = settings.db_replica_max_lag,
+        check_interval: float = settings.db_replica_check_interval,
+    ) -> None:
+        self.replicas = [Replica(engine) for engine in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.turns = itertools.count()
+        self.primary_reads = 0
+        self.checker: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        """Starts the lag checker task."""
+        self.checker = asyncio.create_task(self._check_forever())
+
+    async def stop(self) -> None:
+        """Stops the lag checker task and disposes of the replica engines."""
+        if self.checker is not None:
+            self.checker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.checker
+            self.checker = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def read_session(self) -> Optional[AsyncSession]:
+        """
+        Open the session of the next read on a replica, connected.
+
+        :return: session on the next fresh replica, None when the read must
+            go to the primary, as there is none or it can't be connected to.
+        """
+        replica = self._next_replica()
+        if replica is not None:
+            session = replica.session_factory()
+            try:
+                # Bounded like the checks, connecting to a replica that
+                # drops packets would take the whole connect timeout
+                await asyncio.wait_for(session.connection(), self.check_interval)
+            except (OperationalError, InterfaceError, TimeoutError, OSError):
+                logger.warning(
+                    "Replica %s is unreachable, reading from the primary",
+                    replica.engine.url,
+                    exc_info=True,
+                )
+                replica.lag = None
+                await session.close()
+            else:
+                replica.reads += 1
+                return session
+        self.primary_reads += 1
+        return None
+
+    def _next_replica(self) -> Optional[Replica]:
+        measured_after = time.monotonic() - self.check_interval * LAG_VALID_CHECKS
+        fresh = []
+        for replica in self.replicas:
+            if replica.lag is not None and replica.measured_at < measured_after:
+                logger.warning("Lag of replica %s is outdated", replica.engine.url)
+                replica.lag = None
+            if replica.lag is not None and replica.lag <= self.max_lag:
+                fresh.append(replica)
+        if not fresh:
+            return None
+        return fresh[next(self.turns) % len(fresh)]
+
+    async def check(self) -> None:
+        """Measure the replication lag of every replica."""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            # Connecting is bounded too, a replica dropping packets
+            # would block it for the whole connect timeout
+            lag = await asyncio.wait_for(
+                self._measure_lag(replica),
+                self.check_interval,
+            )
+        except Exception:
+            if replica.lag is not None:
+                logger.warning("Replica %s is unreachable", replica.engine.url)
+            replica.lag = None
+            return
+        replica.lag = None if lag is None else float(lag)
+        replica.measured_at = time.monotonic()
+
+    async def _measure_lag(self, replica: Replica) -> Optional[float]:
+        async with replica.engine.connect() as connection:
+            return await connection.scalar(LAG_QUERY)
+
+    async def _check_forever(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
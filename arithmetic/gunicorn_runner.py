@@ -28,6 +28,20 @@ class UvicornWorker(BaseUvicornWorker):
     }
 
 
+def child_exit(_server: Any, worker: Any) -> None:
+    """
+    Drops the live gauges of a worker that exited.
+
+    :param worker: the worker that exited.
+    """
+    # Imported here, prometheus_client must not be imported by the master
+    # before the multiprocess directory is set, or forked workers inherit
+    # its in-memory values
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
 class GunicornApplication(BaseApplication):
     """
     Custom gunicorn application.
@@ -48,6 +62,7 @@ class GunicornApplication(BaseApplication):
             "bind": f"{host}:{port}",
             "workers": workers,
             "worker_class": "arithmetic.gunicorn_runner.UvicornWorker",
+            "child_exit": child_exit,
             **kwargs,
         }
         self.app = app
@@ -0,0 +1,113 @@
+"""
+Prometheus metrics of the application.
+
+With gunicorn every worker is a process of its own, so the metrics are
+kept in the prometheus_client multiprocess mode: each worker writes its
+values to memory-mapped files in settings.prometheus_dir, and whichever
+worker serves /api/metrics adds up the files of all of them. The directory
+is chosen by the PROMETHEUS_MULTIPROC_DIR environment variable, which
+must be set before prometheus_client is imported, see arithmetic.__main__.
+Without it, as in tests, the metrics stay in the memory of the process.
+
+Updating a metric only takes a lock and a few writes into the memory map,
+a few microseconds, and labels have bounded values, so collection can
+stay on under full load.
+"""
+
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+# Buckets of work that normally takes a few milliseconds
+FAST_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+REQUEST_DURATION = Histogram(
+    "arithmetic_request_duration_seconds",
+    "Time spent serving HTTP requests, until the last byte of the response.",
+    ["method", "route", "status"],
+)
+DB_QUERY_DURATION = Histogram(
+    "arithmetic_db_query_duration_seconds",
+    "Time spent executing SQL statements.",
+    ["statement", "table"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "arithmetic_db_pool_checkout_duration_seconds",
+    "Time spent waiting for a pooled connection, or opening a new one.",
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter(
+    "arithmetic_db_pool_timeouts",
+    "Checkouts that gave up after the pool timeout.",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "arithmetic_db_pool_checked_out",
+    "Connections checked out of the pools.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAITING = Gauge(
+    "arithmetic_db_pool_waiting",
+    "Checkouts waiting for a connection.",
+    multiprocess_mode="livesum",
+)
+USER_LOCK_WAIT = Histogram(
+    "arithmetic_user_lock_wait_seconds",
+    "Time spent waiting for the lock of a user before an operation.",
+    ["backend"],
+    buckets=FAST_BUCKETS,
+)
+RANDOM_ORG_DURATION = Histogram(
+    "arithmetic_random_org_request_duration_seconds",
+    "Time spent on requests to random.org.",
+    ["outcome"],
+)
+TOKEN_CACHE_REQUESTS = Counter(
+    "arithmetic_token_cache_requests",
+    "Lookups in the cache of verified tokens.",
+    ["result"],
+)
+EVENT_LOOP_LAG = Histogram(
+    "arithmetic_event_loop_lag_seconds",
+    "How late the event loop runs a callback scheduled on time.",
+    buckets=FAST_BUCKETS,
+)
+EVENT_LOOP_STALLS = Counter(
+    "arithmetic_event_loop_stalls",
+    "Callbacks that blocked the event loop for longer than the threshold.",
+)
+
+
+def generate_metrics() -> bytes:
+    """
+    Render the metrics in the text exposition format.
+
+    :return: metrics of every worker, or of this process
+        outside of the multiprocess mode.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from functools import partial
+from math import sqrt
+from typing import Callable, Mapping, Optional
+
+from fastapi import HTTPException
+from starlette import status
+from starlette.requests import Request
+
+from arithmetic.services.expression import CompiledExpression
+from arithmetic.services.number_format import format_number
+from arithmetic.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def compute(type: str, first_term: int, second_term: Optional[int]) -> str:
+    """
+    Compute a single arithmetic operation.
+
+    It only depends on its arguments, so it can run in another process.
+
+    :param type: type of the operation, a value of OperationEnum.
+    :param first_term: first term of the operation.
+    :param second_term: second term, None for a square root.
+    :raises ArithmeticError: if the result can't be represented.
+    :return: the formatted result.
+    """
+    match type:
+        case "addition":
+            return format_number(first_term + second_term)  # type: ignore[operator]
+        case "subtraction":
+            return format_number(first_term - second_term)  # type: ignore[operator]
+        case "multiplication":
+            return format_number(first_term * second_term)  # type: ignore[operator]
+        case "division":
+            return format_number(first_term / second_term)  # type: ignore[operator]
+        case "squareRoot":
+            return format_number(sqrt(first_term))
+    raise ValueError(f"Invalid Type {type}")
+
+
+def evaluate_expression(
+    compiled: CompiledExpression,
+    variables: Mapping[str, int],
+) -> str:
+    """
+    Evaluate a compiled expression.
+
+    :param compiled: compiled expression, picklable.
+    :param variables: values of the variables of the expression.
+    :raises ExpressionError: if the result is undefined.
+    :return: the formatted result.
+    """
+    return compiled.evaluate(variables)
+
+
+class ArithmeticExecutor:
+    """
+    Size-aware runner for arithmetic.
+
+    Operations whose result is known to be small are computed inline, which
+    is far cheaper than a round trip to another process. Bigger ones, which
+    could block the event loop for a long time, run in a process pool.
+    At most max_pending of them wait for or use the pool at a time, and
+    they have a deadline. A computation that misses it is abandoned but
+    keeps its worker busy until it finishes, which the deadline and the
+    operand limits keep short.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[Executor],
+        inline_max_bits: int = settings.arithmetic_inline_max_bits,
+        max_pending: int = settings.arithmetic_max_pending,
+        timeout: float = settings.arithmetic_timeout,
+    ) -> None:
+        self.pool = pool
+        self.inline_max_bits = inline_max_bits
+        self.pending = asyncio.Semaphore(max_pending)
+        self.timeout = timeout
+
+    async def run(self, result_bits: int, func: Callable[[], str]) -> str:
+        """
+        Run a computation inline or in the pool depending on its size.
+
+        :param result_bits: upper bound of the bits of the result.
+        :param func: picklable computation.
+        :raises HTTPException: if the result can't be represented, or the
+            computation didn't finish in time.
+        :return: the result of the computation.
+        """
+        try:
+            if self.pool is None or result_bits <= self.inline_max_bits:
+                return func()
+            return await asyncio.wait_for(self._offload(func), self.timeout)
+        except (ArithmeticError, ValueError) as err:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(err),
+            ) from err
+        except asyncio.TimeoutError as err:
+            logger.warning("Operation of %s bits timed out", result_bits)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Operation took too long.",
+            ) from err
+
+    async def calculate(
+        self,
+        type: str,
+        first_term: int,
+        second_term: Optional[int],
+    ) -> str:
+        """
+        Compute a single arithmetic operation.
+
+        :param type: type of the operation, a value of OperationEnum.
+        :param first_term: first term of the operation.
+        :param second_term: second term, None for a square root.
+        :return: the formatted result.
+        """
+        bits = (first_term.bit_length(), (second_term or 0).bit_length())
+        # Only a product outgrows its terms, the other operations take time
+        # linear in their size and give results no bigger than them
+        result_bits = sum(bits) if type == "multiplication" else max(bits) + 1
+        return await self.run(
+            result_bits,
+            partial(compute, type, first_term, second_term),
+        )
+
+    async def evaluate(
+        self,
+        compiled: CompiledExpression,
+        variables: Mapping[str, int],
+    ) -> str:
+        """
+        Evaluate a compiled expression.
+
+        :param compiled: compiled expression.
+        :param variables: values of the variables of the expression.
+        :return: the formatted result.
+        """
+        return await self.run(
+            compiled.result_bits(variables),
+            partial(evaluate_expression, compiled, variables),
+        )
+
+    async def _offload(self, func: Callable[[], str]) -> str:
+        async with self.pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, func)
+
+
+def get_arithmetic_executor(request: Request) -> ArithmeticExecutor:
+    """
+    Get the arithmetic executor of the application.
+
+    :param request: current request.
+    :return: arithmetic executor.
+    """
+    return request.app.state.arithmetic_executor
@@ -0,0 +1,347 @@
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from math import sqrt
+from typing import Dict, FrozenSet, List, Mapping, Optional
+
+from arithmetic.services.number_format import Number, format_number
+from arithmetic.settings import settings
+
+# Operation types (values of OperationEnum) billed for each node of a tree
+ADDITION = "addition"
+SUBTRACTION = "subtraction"
+MULTIPLICATION = "multiplication"
+DIVISION = "division"
+SQUARE_ROOT = "squareRoot"
+
+FUNCTIONS = {"sqrt": SQUARE_ROOT}
+
+TOKEN = re.compile(r"\d+|[A-Za-z_][A-Za-z0-9_]*|[-+*/()]")
+NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+SPACES_AROUND_SYMBOLS = re.compile(r" ?([-+*/()]) ?")
+
+
+class ExpressionError(ValueError):
+    """An expression is malformed, too big or can't be evaluated."""
+
+
+class Node(ABC):
+    """Node of a compiled expression tree."""
+
+    @abstractmethod
+    def evaluate(self, variables: Mapping[str, int]) -> Number:
+        """
+        Compute the value of the node.
+
+        :param variables: values of the variables of the expression.
+        :raises ExpressionError: if the value is undefined.
+        :return: value of the node.
+        """
+
+
+class Constant(Node):
+    """Integer literal."""
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+    def evaluate(self, variables: Mapping[str, int]) -> Number:
+        """Compute the value of the node."""
+        return self.value
+
+
+class Variable(Node):
+    """Named value given along with the expression."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def evaluate(self, variables: Mapping[str, int]) -> Number:
+        """Compute the value of the node."""
+        return variables[self.name]
+
+
+class Negation(Node):
+    """Unary minus."""
+
+    def __init__(self, operand: Node) -> None:
+        self.operand = operand
+
+    def evaluate(self, variables: Mapping[str, int]) -> Number:
+        """Compute the value of the node."""
+        return -self.operand.evaluate(variables)
+
+
+class SquareRoot(Node):
+    """Square root of a non negative value."""
+
+    def __init__(self, operand: Node) -> None:
+        self.operand = operand
+
+    def evaluate(self, variables: Mapping[str, int]) -> Number:
+        """Compute the value of the node."""
+        value = self.operand.evaluate(variables)
+        if value < 0:
+            raise ExpressionError("Square root of a negative number.")
+        try:
+            return sqrt(value)
+        except OverflowError as err:
+            raise ExpressionError("Value too large for a square root.") from err
+
+
+class BinaryOperation(Node):
+    """Addition, subtraction, multiplication or division of two values."""
+
+    def __init__(self, operator: str, left: Node, right: Node) -> None:
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    def evaluate(self, variables: Mapping[str, int]) -> Number:
+        """Compute the value of the node."""
+        left = self.left.evaluate(variables)
+        right = self.right.evaluate(variables)
+        match self.operator:
+            case "+":
+                return left + right
+            case "-":
+                return left - right
+            case "*":
+                return left * right
+        if right == 0:
+            raise ExpressionError("Division by Zero error.")
+        try:
+            return left / right
+        except OverflowError as err:
+            raise ExpressionError("Value too large for a division.") from err
+
+
+BINARY_OPERATIONS = {
+    "+": ADDITION,
+    "-": SUBTRACTION,
+    "*": MULTIPLICATION,
+    "/": DIVISION,
+}
+
+
+class CompiledExpression:
+    """
+    An expression parsed into an evaluation tree.
+
+    Besides the tree it keeps what billing needs, how many nodes of each
+    operation type the tree has, the variables it expects and how often
+    they are used, and the bits taken by its constants.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        root: Node,
+        operations: Dict[str, int],
+        variable_uses: Dict[str, int],
+        constant_bits: int,
+    ) -> None:
+        self.text = text
+        self.root = root
+        self.operations = operations
+        self.variable_uses = variable_uses
+        self.variables: FrozenSet[str] = frozenset(variable_uses)
+        self.constant_bits = constant_bits
+
+    def result_bits(self, variables: Mapping[str, int]) -> int:
+        """
+        Bound the size of the result without computing it.
+
+        For every operator |x op y| <= (|x| + 1) * (|y| + 1), so the result
+        never takes more bits than its leaves plus one bit per leaf.
+
+        :param variables: values of the variables of the expression.
+        :return: upper bound of the bits of the result.
+        """
+        return self.constant_bits + sum(
+            uses * (variables.get(name, 0).bit_length() + 1)
+            for name, uses in self.variable_uses.items()
+        )
+
+    def evaluate(self, variables: Optional[Mapping[str, int]] = None) -> str:
+        """
+        Compute the result of the expression.
+
+        :param variables: values of the variables of the expression.
+        :raises ExpressionError: if a variable is missing or the result
+            is undefined.
+        :return: the result, formatted like the other operations.
+        """
+        variables = variables or {}
+        missing = self.variables - variables.keys()
+        if missing:
+            raise ExpressionError(f"Missing variables: {', '.join(sorted(missing))}.")
+        return format_number(self.root.evaluate(variables))
+
+
+class Parser:
+    """
+    Recursive descent parser for arithmetic expressions.
+
+    The grammar only knows integers, variables, the four basic operators,
+    unary minus, parentheses and sqrt(), so nothing but arithmetic can ever
+    be evaluated. Nesting depth and tree size are bounded.
+    """
+
+    def __init__(self, text: str, max_depth: int, max_nodes: int) -> None:
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.position = 0
+        self.depth = 0
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.operations: Dict[str, int] = Counter()
+        self.variable_uses: Dict[str, int] = Counter()
+        self.constant_bits = 0
+
+    def parse(self) -> CompiledExpression:
+        """
+        Parse the whole text.
+
+        :raises ExpressionError: if the text is not a valid expression.
+        :return: the compiled expression.
+        """
+        root = self._expression()
+        if self._peek() is not None:
+            raise ExpressionError(f"Unexpected '{self._peek()}'.")
+        return CompiledExpression(
+            text=self.text,
+            root=root,
+            operations=dict(self.operations),
+            variable_uses=dict(self.variable_uses),
+            constant_bits=self.constant_bits,
+        )
+
+    def _tokenize(self, text: str) -> List[str]:
+        tokens = TOKEN.findall(text)
+        if "".join(tokens) != text.replace(" ", ""):
+            raise ExpressionError("Invalid characters in expression.")
+        return tokens
+
+    def _peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise ExpressionError("Unexpected end of expression.")
+        self.position += 1
+        return token
+
+    def _expect(self, expected: str) -> None:
+        token = self._next()
+        if token != expected:
+            raise ExpressionError(f"Expected '{expected}' but found '{token}'.")
+
+    def _node(self, node: Node, operation: Optional[str] = None) -> Node:
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise ExpressionError(
+                f"Expression has more than {self.max_nodes} nodes.",
+            )
+        if operation is not None:
+            self.operations[operation] += 1
+        return node
+
+    def _expression(self) -> Node:
+        node = self._term()
+        while self._peek() in {"+", "-"}:
+            operator = self._next()
+            node = self._node(
+                BinaryOperation(operator, node, self._term()),
+                BINARY_OPERATIONS[operator],
+            )
+        return node
+
+    def _term(self) -> Node:
+        node = self._factor()
+        while self._peek() in {"*", "/"}:
+            operator = self._next()
+            node = self._node(
+                BinaryOperation(operator, node, self._factor()),
+                BINARY_OPERATIONS[operator],
+            )
+        return node
+
+    def _factor(self) -> Node:
+        self.depth += 1
+        if self.depth > self.max_depth:
+            raise ExpressionError(
+                f"Expression is nested more than {self.max_depth} levels.",
+            )
+        token = self._next()
+        match token:
+            case "-":
+                node = self._node(Negation(self._factor()))
+            case "+":
+                node = self._factor()
+            case "(":
+                node = self._expression()
+                self._expect(")")
+            case _ if token.isdigit():
+                value = int(token)
+                self.constant_bits += value.bit_length() + 1
+                node = self._node(Constant(value))
+            case _ if token in FUNCTIONS:
+                self._expect("(")
+                node = self._node(SquareRoot(self._expression()), FUNCTIONS[token])
+                self._expect(")")
+            case _ if token[0].isalpha() or token[0] == "_":
+                self.variable_uses[token] += 1
+                node = self._node(Variable(token))
+            case _:
+                raise ExpressionError(f"Unexpected '{token}'.")
+        self.depth -= 1
+        return node
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize an expression, so equivalent spellings share a cache entry.
+
+    Function names are case insensitive and written in lowercase, while
+    variable names keep their case, as they must match the given variables.
+
+    :param text: expression as written by the user.
+    :return: the expression with lowercase function names, and whitespace
+        only where it separates two names or numbers.
+    """
+    text = SPACES_AROUND_SYMBOLS.sub(r"\1", " ".join(text.split()))
+    return NAME.sub(_lower_function, text)
+
+
+def _lower_function(match: "re.Match[str]") -> str:
+    name = match.group()
+    return name.lower() if name.lower() in FUNCTIONS else name
+
+
+@lru_cache(maxsize=settings.expression_cache_size)
+def _compile_normalized(text: str) -> CompiledExpression:
+    return Parser(
+        text,
+        max_depth=settings.expression_max_depth,
+        max_nodes=settings.expression_max_nodes,
+    ).parse()
+
+
+def compile_expression(text: str) -> CompiledExpression:
+    """
+    Compile an expression, reusing the tree of a previous compilation.
+
+    Compiled expressions are immutable, so they are kept in a process-wide
+    LRU cache keyed by their normalized text.
+
+    :param text: expression as written by the user.
+    :raises ExpressionError: if the text is not a valid expression.
+    :return: the compiled expression.
+    """
+    return _compile_normalized(normalize(text))
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.requests import Request
+
+from arithmetic.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Work = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class PendingWrite:
+    """A unit of work waiting for the next group commit."""
+
+    def __init__(self, work: Work, future: "asyncio.Future[Any]") -> None:
+        self.work = work
+        self.future = future
+
+
+class GroupCommitter:
+    """
+    Write-behind buffer that commits concurrent writes together.
+
+    Callers submit a unit of work, a coroutine function that stages its
+    changes on the session it receives. A single flusher task collects the
+    units that arrive within max_delay seconds, up to max_batch of them,
+    runs them one after the other on one session and commits once. Each
+    caller gets its result only after that commit succeeded.
+
+    An HTTPException raised by a unit is its answer to the caller, such as
+    402 when the balance doesn't cover a debit, and must leave the session
+    untouched. If the commit fails every unit of the batch is retried in its
+    own transaction, so one bad write doesn't fail the others.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_batch: int = settings.group_commit_max_batch,
+        max_delay: float = settings.group_commit_max_delay,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: asyncio.Queue[PendingWrite] = asyncio.Queue()
+        self.flusher: Optional[asyncio.Task[None]] = None
+        self.commits = 0
+
+    def start(self) -> None:
+        """Starts the flusher task."""
+        self.flusher = asyncio.create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        """Commits the pending writes and stops the flusher task."""
+        if self.flusher is None:
+            return
+        await self.queue.join()
+        self.flusher.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.flusher
+        self.flusher = None
+
+    async def submit(self, work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """
+        Run a unit of work in the next group commit.
+
+        :param work: coroutine function that stages changes on a session.
+        :raises HTTPException: if the unit answered with one.
+        :return: the result of the unit, once it is committed.
+        """
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(PendingWrite(work, future))
+        return await future
+
+    async def _flush_forever(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _flush(self, batch: List[PendingWrite]) -> None:
+        try:
+            outcomes = await self._commit(batch)
+        except Exception as err:
+            if len(batch) == 1:
+                logger.exception("Write failed")
+                _resolve(batch[0].future, exception=err)
+                return
+            logger.warning(
+                "Group commit of %s writes failed, retrying them one by one",
+                len(batch),
+                exc_info=True,
+            )
+            for write in batch:
+                await self._flush([write])
+            return
+        for write, (result, error) in zip(batch, outcomes):
+            _resolve(write.future, result=result, exception=error)
+
+    async def _commit(
+        self,
+        batch: List[PendingWrite],
+    ) -> List[tuple[Any, Optional[HTTPException]]]:
+        outcomes: List[tuple[Any, Optional[HTTPException]]] = []
+        async with self.session_factory() as session:
+            for write in batch:
+                try:
+                    outcomes.append((await write.work(session), None))
+                except HTTPException as err:
+                    outcomes.append((None, err))
+            await session.commit()
+        self.commits += 1
+        return outcomes
+
+
+def _resolve(
+    future: "asyncio.Future[Any]",
+    result: Any = None,
+    exception: Optional[BaseException] = None,
+) -> None:
+    # The caller may be gone, e.g. its request was cancelled
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+def get_group_committer(request: Request) -> Optional[GroupCommitter]:
+    """
+    Get the group committer of the application.
+
+    :param request: current request.
+    :return: group committer, None if group commit is disabled.
+    """
+    return getattr(request.app.state, "group_committer", None)
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import suppress
+from typing import Deque, Dict, Optional
+
+from starlette.requests import Request
+
+from arithmetic.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+from arithmetic.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Stalls kept for the monitoring router, the oldest are dropped
+STALLS_KEPT = 20
+
+
+class Stall:
+    """A callback that blocked the event loop, and where it was caught."""
+
+    def __init__(self, stack: str) -> None:
+        self.detected_at = time.time()
+        self.stack = stack
+        # Lag of the heartbeat it delayed, known once the loop is free again
+        self.lag: Optional[float] = None
+
+
+class LoopLagMonitor:
+    """
+    Measures the lag of the event loop and catches the callbacks blocking it.
+
+    A heartbeat coroutine sleeps for interval seconds over and over, and
+    how late it wakes up is the lag every other coroutine of the worker
+    sees. The last lags are kept for percentiles, and exported as a
+    prometheus histogram.
+
+    A watchdog thread checks how long ago the heartbeat last ran. Once
+    it is more than threshold seconds overdue, whatever runs on the loop
+    is blocking it, so the watchdog captures the stack of the loop thread
+    right then and logs it. Each stall is captured once.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.loop_monitor_interval,
+        threshold: float = settings.loop_monitor_threshold,
+        samples: int = settings.loop_monitor_samples,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=samples)
+        self.stalls: Deque[Stall] = deque(maxlen=STALLS_KEPT)
+        self.blocked = 0
+        # Monotonic time the heartbeat last ran, read by the watchdog
+        self.beat = time.monotonic()
+        self.stall: Optional[Stall] = None
+        self.loop_thread_id: Optional[int] = None
+        self.heartbeat: Optional[asyncio.Task[None]] = None
+        self.stopped = threading.Event()
+        self.watchdog = threading.Thread(
+            target=self._watch,
+            name="loop-watchdog",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        """Starts the heartbeat and the watchdog, on the running loop."""
+        self.loop_thread_id = threading.get_ident()
+        self.beat = time.monotonic()
+        self.heartbeat = asyncio.create_task(self._beat_forever())
+        self.watchdog.start()
+
+    async def stop(self) -> None:
+        """Stops the heartbeat and the watchdog."""
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.heartbeat
+            self.heartbeat = None
+        self.stopped.set()
+        await asyncio.to_thread(self.watchdog.join)
+
+    def percentiles(self) -> Dict[str, float]:
+        """
+        Get percentiles of the last lags.
+
+        :return: p50, p90, p99 and max lag in seconds, zeros before any sample.
+        """
+        if len(self.lags) < 2:
+            lag = self.lags[0] if self.lags else 0.0
+            return {"p50": lag, "p90": lag, "p99": lag, "max": lag}
+        cuts = statistics.quantiles(self.lags, n=100, method="inclusive")
+        return {
+            "p50": cuts[49],
+            "p90": cuts[89],
+            "p99": cuts[98],
+            "max": max(self.lags),
+        }
+
+    async def _beat_forever(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.beat = now
+            lag = max(now - start - self.interval, 0.0)
+            self.lags.append(lag)
+            EVENT_LOOP_LAG.observe(lag)
+            stall, self.stall = self.stall, None
+            if stall is not None:
+                stall.lag = lag
+
+    def _watch(self) -> None:
+        captured_beat = None
+        while not self.stopped.wait(self.threshold / 2):
+            beat = self.beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == captured_beat:
+                continue
+            # The only way to read the frame of another thread
+            frame = sys._current_frames().get(self.loop_thread_id or 0)  # noqa: SLF001
+            if frame is None:
+                continue
+            captured_beat = beat
+            stall = Stall("".join(traceback.format_stack(frame)))
+            self.stalls.append(stall)
+            self.stall = stall
+            self.blocked += 1
+            EVENT_LOOP_STALLS.inc()
+            logger.warning(
+                "Event loop blocked for more than %.3f s at:\n%s",
+                overdue,
+                stall.stack,
+            )
+
+
+def get_loop_monitor(request: Request) -> Optional[LoopLagMonitor]:
+    """
+    Get the event loop monitor of the application.
+
+    :param request: current request.
+    :return: loop monitor, None if it is disabled.
+    """
+    return getattr(request.app.state, "loop_monitor", None)
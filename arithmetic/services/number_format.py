@@ -0,0 +1,42 @@
+from math import log10
+from typing import Union
+
+Number = Union[int, float]
+
+# Integers up to this size are converted with str(), which is quadratic and
+# refuses integers of more than 4300 digits, so bigger ones are split first
+CHUNK_BITS = 3000
+
+
+def int_to_str(value: int) -> str:
+    """
+    Convert an integer of any size to its decimal representation.
+
+    The integer is split in halves by a power of ten until every chunk is
+    small enough for str(), so neither the interpreter digit limit nor a
+    single huge conversion gets in the way.
+
+    :param value: integer to convert.
+    :return: decimal representation of the integer.
+    """
+    if value < 0:
+        return "-" + int_to_str(-value)
+    if value.bit_length() <= CHUNK_BITS:
+        return str(value)
+    # Upper bound of the digits, off by one at most, so high is never zero
+    digits = int(value.bit_length() * log10(2)) + 1
+    half = digits // 2
+    high, low = divmod(value, 10**half)
+    return int_to_str(high) + int_to_str(low).zfill(half)
+
+
+def format_number(value: Number) -> str:
+    """
+    Format the result of an operation.
+
+    :param value: result of the operation.
+    :return: the result as returned to the user.
+    """
+    if isinstance(value, int):
+        return int_to_str(value)
+    return str(value)
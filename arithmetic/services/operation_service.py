@@ -1,14 +1,23 @@
-from math import sqrt
-from typing import Optional, cast
+from typing import Dict, List, Optional, cast
 
 from fastapi import Depends
 
 from arithmetic.db.dao.operation_dao import OperationDAO
-from arithmetic.services.random_service import generate_random_string
+from arithmetic.db.models.record_model import RecordModel
+from arithmetic.services.arithmetic_executor import (
+    ArithmeticExecutor,
+    get_arithmetic_executor,
+)
+from arithmetic.services.expression import compile_expression
+from arithmetic.services.random_service import RandomStringProvider, get_random_strings
 from arithmetic.services.record_service import RecordService
-from arithmetic.services.user_level_lock import UserLevelLock
-from arithmetic.services.user_service import UserService
-from arithmetic.web.api.operation.schema import OperationEnum
+from arithmetic.services.user_level_lock import UserLevelLock, get_user_lock
+from arithmetic.timing import Span
+from arithmetic.web.api.operation.schema import (
+    OperationBase,
+    OperationEnum,
+    OperationResultDTO,
+)
 
 
 class OperationService:
@@ -17,13 +26,16 @@ class OperationService:
     def __init__(
         self,
         operation_dao: OperationDAO = Depends(),
-        user_service: UserService = Depends(),
         record_service: RecordService = Depends(),
+        user_lock: UserLevelLock = Depends(get_user_lock),
+        random_strings: RandomStringProvider = Depends(get_random_strings),
+        arithmetic: ArithmeticExecutor = Depends(get_arithmetic_executor),
     ) -> None:
         self.operation_dao = operation_dao
-        self.user_service = user_service
         self.record_service = record_service
-        self.user_lock = UserLevelLock()
+        self.user_lock = user_lock
+        self.random_strings = random_strings
+        self.arithmetic = arithmetic
 
     async def perform_operation(
         self,
@@ -31,31 +43,127 @@ class OperationService:
         type: OperationEnum,
         first_term: Optional[int],
         second_term: Optional[int],
+        expression: Optional[str] = None,
+        variables: Optional[Dict[str, int]] = None,
     ) -> str:
-        """Perform the operation."""
-        lock = await self.user_lock.acquire(user_id)
-        async with lock:
-            user = await self.user_service.get_user_by_id(user_id)
-            operation = await self.operation_dao.get_operation(str(type.value))
-            if user.balance < operation.cost:
-                raise Exception("Not enough balance.")
-            # I ignore types since parameters were already validated by using
-            # a pydantic validator
-            result = await self.calculate_result(type, first_term, second_term)
-            await self.record_service.create_record(
-                user_id=user.id,
-                operation_id=operation.id,
-                amount=operation.cost,
-                user_balance=user.balance - operation.cost,
-                operation_text=self.get_operation_text(
+        """
+        Perform the operation.
+
+        The user is debited before the result is computed, so an operation
+        the user can't afford never reaches random.org nor the arithmetic
+        pool. The balance check happens in the same statement that debits
+        the user, so it stays correct without relying on the user lock.
+        """
+        async with self.user_lock.hold(user_id):
+            record = await self.quote_record(
+                type,
+                first_term,
+                second_term,
+                expression,
+                variables,
+            )
+            async with self.record_service.billing(user_id, [record]):
+                record.operation_response = await self.compute_result(
                     type,
                     first_term,
                     second_term,
-                ),
-                operation_response=result,
-            )
-            await self.user_lock.release(user_id)
-            return result
+                    expression,
+                    variables,
+                )
+            return record.operation_response
+
+    async def perform_operations(
+        self,
+        user_id: int,
+        operations: List[OperationBase],
+    ) -> List[OperationResultDTO]:
+        """
+        Perform several operations, billing and recording them at once.
+
+        The total cost is debited in a single statement before any operation
+        is computed, and every record is saved with a single insert, in the
+        same transaction. If the user can't afford all of them none is
+        performed.
+        """
+        async with self.user_lock.hold(user_id):
+            records = [
+                await self.quote_record(
+                    operation.type,
+                    operation.first_term,
+                    operation.second_term,
+                    operation.expression,
+                    operation.variables,
+                )
+                for operation in operations
+            ]
+            async with self.record_service.billing(user_id, records):
+                for operation, record in zip(operations, records):
+                    record.operation_response = await self.compute_result(
+                        operation.type,
+                        operation.first_term,
+                        operation.second_term,
+                        operation.expression,
+                        operation.variables,
+                    )
+            return [
+                OperationResultDTO(
+                    type=operation.type,
+                    result=record.operation_response,
+                    cost=record.amount,
+                    user_balance=record.user_balance,
+                )
+                for operation, record in zip(operations, records)
+            ]
+
+    async def quote_record(
+        self,
+        type: OperationEnum,
+        first_term: Optional[int],
+        second_term: Optional[int],
+        expression: Optional[str] = None,
+        variables: Optional[Dict[str, int]] = None,
+    ) -> RecordModel:
+        """
+        Build the record of an operation and its cost, without computing it.
+
+        An expression costs its own operation plus, for every node of its
+        tree, the cost of the matching operation, so a formula is never
+        cheaper than performing its steps one by one.
+        """
+        with Span("catalog"):
+            operation = await self.operation_dao.get_operation(str(type.value))
+            amount = operation.cost
+            if type == OperationEnum.EXPRESSION:
+                compiled = compile_expression(cast(str, expression))
+                for operation_type, count in compiled.operations.items():
+                    step = await self.operation_dao.get_operation(operation_type)
+                    amount += step.cost * count
+        return RecordModel(
+            operation_id=operation.id,
+            amount=amount,
+            operation_text=self.get_operation_text(
+                type,
+                first_term,
+                second_term,
+                expression,
+                variables,
+            ),
+        )
+
+    async def compute_result(
+        self,
+        type: OperationEnum,
+        first_term: Optional[int],
+        second_term: Optional[int],
+        expression: Optional[str] = None,
+        variables: Optional[Dict[str, int]] = None,
+    ) -> str:
+        """Compute the result of an operation, expressions included."""
+        if type == OperationEnum.EXPRESSION:
+            compiled = compile_expression(cast(str, expression))
+            with Span("compute"):
+                return await self.arithmetic.evaluate(compiled, variables or {})
+        return await self.calculate_result(type, first_term, second_term)
 
     async def calculate_result(
         self,
@@ -63,38 +171,53 @@ class OperationService:
         first_term: Optional[int],
         second_term: Optional[int],
     ) -> str:
-        """Perform operation based on the type and parameters provided by the user."""
+        """
+        Perform operation based on the type and parameters provided by the user.
+
+        Arithmetic on large operands runs off the event loop.
+        """
         match type:
-            case OperationEnum.ADDITION:
-                return str(first_term + second_term)  # type: ignore[operator]
-            case OperationEnum.SUBTRACTION:
-                return str(first_term - second_term)  # type: ignore[operator]
-            case OperationEnum.MULTIPLICATION:
-                return str(first_term * second_term)  # type: ignore[operator]
-            case OperationEnum.DIVISION:
-                return str(first_term / second_term)  # type: ignore[operator]
-            case OperationEnum.SQUARE:
-                return str(sqrt(float(cast(int, first_term))))  # type: ignore[operator]
             case OperationEnum.RANDOM:
-                return await generate_random_string()
+                with Span("random"):
+                    return await self.random_strings.get()
+            case OperationEnum.EXPRESSION:
+                raise ValueError("Expressions are handled by compute_result")
+        # I ignore types since parameters were already validated by using
+        # a pydantic validator
+        with Span("compute"):
+            return await self.arithmetic.calculate(
+                str(type.value),
+                cast(int, first_term),
+                second_term,
+            )
 
     def get_operation_text(
         self,
         type: OperationEnum,
         first_term: Optional[int],
         second_term: Optional[int],
+        expression: Optional[str] = None,
+        variables: Optional[Dict[str, int]] = None,
     ) -> str:
         """Get the operation text based on the type and the terms."""
         match type:
             case OperationEnum.ADDITION:
-                return f"{first_term}+{second_term}"
+                text = f"{first_term}+{second_term}"
             case OperationEnum.SUBTRACTION:
-                return f"{first_term}-{second_term}"
+                text = f"{first_term}-{second_term}"
             case OperationEnum.MULTIPLICATION:
-                return f"{first_term}*{second_term}"
+                text = f"{first_term}*{second_term}"
             case OperationEnum.DIVISION:
-                return f"{first_term}/{second_term}"
+                text = f"{first_term}/{second_term}"
             case OperationEnum.SQUARE:
-                return f"sqrt({first_term})"
+                text = f"sqrt({first_term})"
             case OperationEnum.RANDOM:
-                return "random"
+                text = "random"
+            case OperationEnum.EXPRESSION:
+                text = compile_expression(cast(str, expression)).text
+                if variables:
+                    bindings = ", ".join(
+                        f"{name}={value}" for name, value in variables.items()
+                    )
+                    text = f"{text} [{bindings}]"
+        return text[: RecordModel.operation_text.type.length]
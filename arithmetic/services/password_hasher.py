@@ -0,0 +1,92 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+from starlette.requests import Request
+
+from arithmetic.settings import settings
+
+T = TypeVar("T")
+
+bcrypt_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
+
+hasher_saturated_error = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many authentication requests, try again later.",
+)
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing and verification off the event loop.
+
+    Every bcrypt call burns hundreds of milliseconds of CPU, so they run in a
+    dedicated executor, and bcrypt releases the GIL while it works. At most
+    max_pending calls wait for or use the executor at a time. A call that
+    can't get a slot within the queue timeout is rejected, so a login burst
+    sheds load instead of piling up.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        max_pending: int = settings.bcrypt_max_pending,
+        queue_timeout: float = settings.bcrypt_queue_timeout,
+        context: CryptContext = bcrypt_context,
+    ) -> None:
+        self.executor = executor
+        self.slots = asyncio.Semaphore(max_pending)
+        self.queue_timeout = queue_timeout
+        self.context = context
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password.
+
+        :param password: plain password.
+        :raises HTTPException: if the hasher is saturated.
+        :return: the bcrypt hash of the password.
+        """
+        return await self._run(partial(self.context.hash, password))
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Check a password against its hash.
+
+        :param password: plain password.
+        :param hashed_password: stored bcrypt hash.
+        :raises HTTPException: if the hasher is saturated.
+        :return: True if the password matches.
+        """
+        return await self._run(
+            partial(self.context.verify, password, hashed_password),
+        )
+
+    async def _run(self, func: Callable[[], T]) -> T:
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError as err:
+            raise hasher_saturated_error from err
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func)
+        finally:
+            self.slots.release()
+
+
+def get_password_hasher(request: Request) -> PasswordHasher:
+    """
+    Get the password hasher of the application.
+
+    :param request: current request.
+    :return: password hasher.
+    """
+    return request.app.state.password_hasher
@@ -0,0 +1,140 @@
+import asyncio
+import hmac
+import sys
+import threading
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import Header, HTTPException
+from starlette import status
+
+from arithmetic.settings import settings
+
+profiler_busy_error = HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail="The worker is already being profiled.",
+)
+
+# One profile at a time per worker, samples of two would mix
+profiler_lock = asyncio.Lock()
+
+
+class StackSampler:
+    """
+    Samples the stacks of running threads from a background thread.
+
+    Every interval seconds the sampler reads the current frame of the
+    threads it watches and counts each distinct stack. It is plain Python,
+    so a sample is only taken when the sampler gets the GIL, and the
+    threads are never stopped nor traced while it doesn't run.
+
+    The counts are rendered as collapsed stacks, one "root;...;leaf count"
+    line per stack, which flamegraph.pl, speedscope or inferno read as is.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.profiler_interval,
+        thread_ids: Optional[Iterable[int]] = None,
+    ) -> None:
+        self.interval = interval
+        # None watches every thread but the sampler
+        self.thread_ids = None if thread_ids is None else set(thread_ids)
+        self.stacks: Counter[str] = Counter()
+        # Names of the functions seen so far, to keep each sample short
+        self.names: Dict[CodeType, str] = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run,
+            name="stack-sampler",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        """Starts sampling."""
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling and waits for the last sample."""
+        self.stopped.set()
+        self.thread.join()
+
+    def collapsed(self) -> str:
+        """
+        Render the samples as collapsed stacks.
+
+        :return: one line per distinct stack, most sampled first.
+        """
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            self.samples += 1
+            # The only way to read the frames of other threads
+            frames = sys._current_frames()  # noqa: SLF001
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                self.stacks[self._collapse(frame)] += 1
+
+    def _collapse(self, frame: Optional[FrameType]) -> str:
+        names: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            name = self.names.get(code)
+            if name is None:
+                name = f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                # Semicolons separate the frames of a collapsed stack
+                name = self.names[code] = name.replace(";", ":")
+            names.append(name)
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+
+def profiling_enabled() -> bool:
+    """
+    Check whether the profiler can be used.
+
+    :return: True if a profiler token is configured.
+    """
+    return bool(settings.profiler_token)
+
+
+def check_profiler_token(token: Optional[str]) -> None:
+    """
+    Check the token of a profiling request.
+
+    :param token: value of the X-Profiler-Token header.
+    :raises HTTPException: 404 while profiling is disabled, so the
+        endpoint looks absent, and 403 if the token doesn't match.
+    """
+    if not profiling_enabled():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if token is None or not hmac.compare_digest(
+        token.encode(),
+        settings.profiler_token.encode(),
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid profiler token.",
+        )
+
+
+def require_profiler_token(
+    x_profiler_token: Optional[str] = Header(default=None),
+) -> None:
+    """
+    Allow the request only to holders of the profiler token.
+
+    :param x_profiler_token: value of the X-Profiler-Token header.
+    :raises HTTPException: if profiling is disabled or the token is wrong.
+    """
+    check_profiler_token(x_profiler_token)
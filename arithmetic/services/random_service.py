@@ -1,33 +1,297 @@
+import asyncio
+import enum
+import logging
+import secrets
+import time
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from typing import List, Optional
+
 import httpx
+from fastapi import HTTPException
+from starlette import status
+from starlette.requests import Request
 
+from arithmetic.metrics import RANDOM_ORG_DURATION
 from arithmetic.settings import settings
 
+logger = logging.getLogger(__name__)
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+STRING_LENGTH = 32
+
 
-async def generate_random_string() -> str:
-    """Generates a random string by querying the random.org API."""
-    url = "https://api.random.org/json-rpc/4/invoke"
+async def generate_random_strings(client: httpx.AsyncClient, n: int) -> List[str]:
+    """
+    Generates random strings by querying the random.org API.
+
+    :param client: pooled client used to reach random.org.
+    :param n: number of strings to generate.
+    :return: the generated strings.
+    """
     headers = {"Content-Type": "application/json"}
     payload = {
         "jsonrpc": "2.0",
         "method": "generateStrings",
         "params": {
             "apiKey": settings.random,
-            "n": 1,
-            "length": 32,
-            "characters": "abcdefghijklmnopqrstuvwxyz",
+            "n": n,
+            "length": STRING_LENGTH,
+            "characters": ALPHABET,
             "replacement": True,
         },
         "id": 42,
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await client.post(settings.random_url, json=payload, headers=headers)
         response_data = response.json()
+        if response.status_code == 200 and "error" not in response_data:
+            outcome = "ok"
+    finally:
+        RANDOM_ORG_DURATION.labels(outcome).observe(time.perf_counter() - start)
 
     # Error handling
-    if response.status_code != 200 or "error" in response_data:
+    if outcome == "error":
         raise Exception(
             f"Error fetching string: {response_data.get('error', 'Unknown error')}",
         )
 
-    return response_data["result"]["random"]["data"][0]
+    return response_data["result"]["random"]["data"]
+
+
+class RandomStringProvider(ABC):
+    """Source of random strings for the randomString operation."""
+
+    @abstractmethod
+    async def get(self) -> str:
+        """
+        Get a random string.
+
+        :return: a random string.
+        """
+
+
+class LocalRandomStrings(RandomStringProvider):
+    """Random strings generated locally with the secrets module."""
+
+    async def get(self) -> str:
+        """
+        Get a random string.
+
+        :return: a random string.
+        """
+        return "".join(secrets.choice(ALPHABET) for _ in range(STRING_LENGTH))
+
+
+class RandomStringBuffer(RandomStringProvider):
+    """
+    Prefetched random strings from random.org.
+
+    A background task asks random.org for strings in batches whenever
+    the buffer drops to the low watermark, and fills it up to the
+    high watermark, so most operations only dequeue a string.
+    If the buffer is empty the string is fetched directly.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        batch_size: int = settings.random_batch_size,
+        low_watermark: int = settings.random_buffer_low_watermark,
+        high_watermark: int = settings.random_buffer_high_watermark,
+    ) -> None:
+        self.client = client
+        self.batch_size = batch_size
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.strings: asyncio.Queue[str] = asyncio.Queue(maxsize=high_watermark)
+        self.refill_needed = asyncio.Event()
+        self.refill_task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        """Starts the background refill task and asks for a first batch."""
+        self.refill_task = asyncio.create_task(self._refill())
+        self.refill_needed.set()
+
+    async def stop(self) -> None:
+        """Stops the background refill task."""
+        if self.refill_task is None:
+            return
+        self.refill_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.refill_task
+        self.refill_task = None
+
+    async def get(self) -> str:
+        """
+        Get a random string, from the buffer if possible.
+
+        :return: a random string.
+        """
+        try:
+            string = self.strings.get_nowait()
+        except asyncio.QueueEmpty:
+            self.refill_needed.set()
+            strings = await generate_random_strings(self.client, 1)
+            return strings[0]
+        if self.strings.qsize() <= self.low_watermark:
+            self.refill_needed.set()
+        return string
+
+    async def _refill(self) -> None:
+        while True:
+            await self.refill_needed.wait()
+            self.refill_needed.clear()
+            missing = self.high_watermark - self.strings.qsize()
+            while missing > 0:
+                try:
+                    strings = await generate_random_strings(
+                        self.client,
+                        min(self.batch_size, missing),
+                    )
+                except Exception:
+                    logger.exception("Could not refill the random string buffer")
+                    break
+                for string in strings:
+                    if self.strings.full():
+                        break
+                    self.strings.put_nowait(string)
+                missing = self.high_watermark - self.strings.qsize()
+
+
+class CircuitState(str, enum.Enum):
+    """Possible states of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to an upstream service.
+
+    The circuit opens after a number of consecutive failures, and calls
+    are rejected while it is open. Once the reset timeout passes it becomes
+    half-open and lets a single trial call through: the circuit closes
+    again if that call succeeds, and opens again if it fails.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.random_failure_threshold,
+        reset_timeout: float = settings.random_reset_timeout,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state of the circuit."""
+        if self.opened_at is None:
+            return CircuitState.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def allow(self) -> bool:
+        """
+        Checks whether a call may go to the upstream service.
+
+        :return: True if the call is allowed.
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Closes the circuit after a successful call."""
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self) -> None:
+        """Counts a failed call, opening the circuit if needed."""
+        self.failures += 1
+        if self.trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial_running = False
+
+    def record_abandoned(self) -> None:
+        """
+        Forgets a call that ended without an outcome, such as a cancelled one.
+
+        The state is left as is, and a half-open circuit lets the next
+        call through as its trial.
+        """
+        self.trial_running = False
+
+
+class ResilientRandomStrings(RandomStringProvider):
+    """
+    Random strings from an upstream provider, guarded by a circuit breaker.
+
+    Every upstream call is bounded by a timeout. Failed calls, and calls
+    rejected by an open circuit, are served by the fallback provider if
+    there is one, so the latency of randomString stays bounded no matter
+    what the upstream does.
+    """
+
+    def __init__(
+        self,
+        upstream: RandomStringProvider,
+        fallback: Optional[RandomStringProvider] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        timeout: float = settings.random_timeout,
+    ) -> None:
+        self.upstream = upstream
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+
+    async def get(self) -> str:
+        """
+        Get a random string.
+
+        :raises HTTPException: if upstream fails and there is no fallback.
+        :return: a random string.
+        """
+        if self.breaker.allow():
+            try:
+                string = await asyncio.wait_for(self.upstream.get(), self.timeout)
+            except Exception:
+                logger.warning("Random string provider failed", exc_info=True)
+                self.breaker.record_failure()
+            except BaseException:
+                # Cancelled, the trial of a half-open circuit must not stay running
+                self.breaker.record_abandoned()
+                raise
+            else:
+                self.breaker.record_success()
+                return string
+        if self.fallback is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Random strings are unavailable.",
+            )
+        return await self.fallback.get()
+
+
+def get_random_strings(request: Request) -> ResilientRandomStrings:
+    """
+    Get the random string provider of the application.
+
+    :param request: current request.
+    :return: random string provider.
+    """
+    return request.app.state.random_strings
@@ -0,0 +1,40 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException
+from starlette import status
+
+invalid_cursor_error = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor",
+)
+
+
+def encode_cursor(date: datetime, record_id: int) -> str:
+    """
+    Build an opaque cursor pointing after a record.
+
+    :param date: date of the record.
+    :param record_id: id of the record.
+    :return: url-safe cursor.
+    """
+    raw = f"{date.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Read the position stored in a cursor.
+
+    :param cursor: cursor built by encode_cursor.
+    :raises HTTPException: if the cursor is malformed.
+    :return: date and id of the record the cursor points after.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, record_id = raw.split("|")
+        return datetime.fromisoformat(date), int(record_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as err:
+        raise invalid_cursor_error from err
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Sequence
+
+from fastapi import Depends
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from arithmetic.db.dao.record_dao import RecordDAO
+from arithmetic.db.dependencies import get_db_session_factory
+from arithmetic.settings import settings
+from arithmetic.web.api.operation.schema import ExportFormat
+
+COLUMNS = (
+    "id",
+    "user_id",
+    "amount",
+    "user_balance",
+    "operation_response",
+    "operation_text",
+    "date",
+)
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+class RecordExportService:
+    """Service class to export the whole history of a user."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = Depends(
+            get_db_session_factory,
+        ),
+    ) -> None:
+        self.session_factory = session_factory
+
+    async def export(
+        self,
+        user_id: int,
+        format: ExportFormat,
+        batch_size: int = settings.export_batch_size,
+    ) -> AsyncIterator[bytes]:
+        """
+        Encode the records of a user as they are read.
+
+        The export owns its session, since it is consumed by a streaming
+        response once the request dependencies are closed. Records have the
+        fields of RecordDTO, with the full timestamp as date.
+
+        :param user_id: id of the user.
+        :param format: format of the export.
+        :param batch_size: records read and encoded at a time.
+        :yield: chunks of the export.
+        """
+        if format == ExportFormat.CSV:
+            yield _encode_csv([COLUMNS])
+        async with self.session_factory() as session:
+            async for rows in RecordDAO(session).stream_records(user_id, batch_size):
+                values = [_values(row) for row in rows]
+                if format == ExportFormat.CSV:
+                    yield _encode_csv(values)
+                else:
+                    yield _encode_ndjson(values)
+
+
+def _values(row: Row[Any]) -> Sequence[object]:
+    return (*row[:-1], row.date.isoformat())
+
+
+def _encode_csv(rows: Sequence[Sequence[object]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(rows: Sequence[Sequence[object]]) -> bytes:
+    return "".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows).encode()
@@ -1,12 +1,29 @@
-from typing import List
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, List, Optional, Sequence
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
 from arithmetic.db.dao.record_dao import RecordDAO
+from arithmetic.db.dao.record_response import CountMode
 from arithmetic.db.dao.user_dao import UserDAO
+from arithmetic.db.dependencies import get_db_read_session
 from arithmetic.db.models.record_model import RecordModel
+from arithmetic.services.group_commit import GroupCommitter, get_group_committer
+from arithmetic.services.record_cursor import decode_cursor, encode_cursor
+from arithmetic.timing import Span
 from arithmetic.web.api.operation.schema import RecordDTO, RecordsDTO
 
+record_list_adapter = TypeAdapter(List[RecordDTO])
+
+not_enough_balance_error = HTTPException(
+    status_code=status.HTTP_402_PAYMENT_REQUIRED,
+    detail="Not enough balance.",
+)
+
 
 class RecordService:
     """Service class to interact with the records DAO."""
@@ -15,66 +32,175 @@ class RecordService:
         self,
         record_dao: RecordDAO = Depends(),
         user_dao: UserDAO = Depends(),
+        group_committer: Optional[GroupCommitter] = Depends(get_group_committer),
     ) -> None:
         self.record_dao = record_dao
         self.user_dao = user_dao
+        self.group_committer = group_committer
+
+    async def create_records(self, user_id: int, records: List[RecordModel]) -> int:
+        """
+        Debit the user for several records and save them in the same transaction.
+
+        With group commit enabled the debit and the records are committed
+        along with those of concurrent operations, and this only returns
+        once that commit succeeded.
+
+        :param user_id: id of the user.
+        :param records: records to be saved, without user nor balance.
+        :return: the balance of the user after the debit.
+        """
+        if self.group_committer is not None:
+
+            async def stage(session: AsyncSession) -> int:
+                user_balance = await self.bill_records(
+                    UserDAO(session),
+                    user_id,
+                    records,
+                )
+                await RecordDAO(session).add_records(records)
+                return user_balance
+
+            return await self.group_committer.submit(stage)
+        user_balance = await self.bill_records(self.user_dao, user_id, records)
+        await self.record_dao.create_records(records)
+        return user_balance
 
-    async def create_record(
+    @asynccontextmanager
+    async def billing(
         self,
         user_id: int,
-        operation_id: int,
-        amount: int,
-        user_balance: int,
-        operation_text: str,
-        operation_response: str,
-    ) -> None:
-        """Call the DAO to save a record."""
-        record = RecordModel(
-            user_id=user_id,
-            operation_id=operation_id,
-            amount=amount,
-            user_balance=user_balance,
-            operation_response=operation_response,
-            operation_text=operation_text,
+        records: List[RecordModel],
+    ) -> AsyncGenerator[None, None]:
+        """
+        Bill the user for records before their block computes them.
+
+        Without group commit the user is debited in the transaction of the
+        request before the block runs, and the records are saved in that
+        same transaction once it succeeds. If the block fails, the debit is
+        given back. With group commit the debit and the records are staged
+        together after the block, so the balance is only checked before it.
+
+        :param user_id: id of the user.
+        :param records: records to be saved, without user nor balance,
+            and whose results the block fills in.
+        :raises HTTPException: if the balance doesn't cover the records.
+        """
+        if self.group_committer is not None:
+            balance = await self.user_dao.get_balance(user_id)
+            if balance is None or balance < sum(record.amount for record in records):
+                raise not_enough_balance_error
+            yield
+            with Span("commit"):
+                await self.create_records(user_id, records)
+            return
+        await self.bill_records(self.user_dao, user_id, records)
+        try:
+            yield
+        except BaseException:
+            await self.user_dao.credit_balance(
+                user_id,
+                sum(record.amount for record in records),
+                records=len(records),
+            )
+            raise
+        with Span("commit"):
+            await self.record_dao.create_records(records)
+
+    async def bill_records(
+        self,
+        user_dao: UserDAO,
+        user_id: int,
+        records: List[RecordModel],
+    ) -> int:
+        """
+        Debit the user for several records, without committing.
+
+        The whole amount is debited at once, and the balance stored on each
+        record is the one left right after it. Nothing is changed if the
+        balance doesn't cover the records.
+
+        :param user_dao: DAO of the session to debit in.
+        :param user_id: id of the user.
+        :param records: records to be saved, without user nor balance.
+        :raises HTTPException: if the balance doesn't cover the records.
+        :return: the balance of the user after the debit.
+        """
+        total = sum(record.amount for record in records)
+        user_balance = await user_dao.debit_balance(
+            user_id,
+            total,
+            records=len(records),
         )
-        await self.record_dao.create_record(record)
-        await self.user_dao.update_user_balance(user_id, user_balance)
+        if user_balance is None:
+            raise not_enough_balance_error
+        balance = user_balance + total
+        for record in records:
+            balance -= record.amount
+            record.user_id = user_id
+            record.user_balance = balance
+        return user_balance
 
     async def get_records(
         self,
         user_id: int,
         limit: int,
         offset: int,
+        cursor: Optional[str] = None,
+        count: CountMode = CountMode.ESTIMATE,
     ) -> RecordsDTO:
-        """Call the DAO to fetch the records."""
+        """
+        Call the DAO to fetch the records.
+
+        One extra record is fetched to know whether there is a next page.
+        """
         records_and_count = await self.record_dao.get_all_records(
             user_id,
-            limit,
+            limit + 1,
             offset,
+            after=decode_cursor(cursor) if cursor else None,
+            count=count,
+        )
+        page = records_and_count.records[:limit]
+        next_cursor = None
+        if len(records_and_count.records) > limit and page:
+            next_cursor = encode_cursor(page[-1].timestamp, page[-1].id)
+        return RecordsDTO(
+            records=self.__convert_records_to_dtos(page),
+            total_count=records_and_count.total_count,
+            next_cursor=next_cursor,
         )
-        records = self.__convert_records_to_dtos(records_and_count.records)
-        count = records_and_count.total_count
-        return RecordsDTO(records=records, total_count=count)
 
     async def delete_record(self, record_id: int) -> None:
         """Deletes a record."""
         await self.record_dao.delete_record(record_id)
 
-    async def search(self, term: str, limit: int, offset: int) -> List[RecordDTO]:
-        """Search a term in the records table."""
-        records = await self.record_dao.search(term, limit, offset)
+    async def search(
+        self,
+        user_id: int,
+        term: str,
+        limit: int,
+        offset: int,
+    ) -> List[RecordDTO]:
+        """Search a term in the records of a user."""
+        records = await self.record_dao.search(user_id, term, limit, offset)
         return self.__convert_records_to_dtos(records)
 
-    def __convert_records_to_dtos(self, records: List[RecordModel]) -> List[RecordDTO]:
-        return [
-            RecordDTO(
-                id=record.id,
-                user_id=record.user_id,
-                amount=record.amount,
-                user_balance=record.user_balance,
-                operation_response=record.operation_response,
-                operation_text=record.operation_text,
-                date=record.date.strftime("%Y-%m-%d"),  # Format date as YYYY-MM-DD
-            )
-            for record in records
-        ]
+    def __convert_records_to_dtos(self, records: Sequence[Row[Any]]) -> List[RecordDTO]:
+        # Validated in one pass by pydantic-core, reading the row attributes
+        return record_list_adapter.validate_python(records, from_attributes=True)
+
+
+def get_record_reader(
+    session: AsyncSession = Depends(get_db_read_session),
+) -> RecordService:
+    """
+    Get a record service for read-only requests.
+
+    Its DAOs use a session on a read replica when one is available,
+    so it must not be used to create nor delete records.
+
+    :param session: read-only database session.
+    :return: record service.
+    """
+    return RecordService(RecordDAO(session), UserDAO(session), None)
@@ -1,40 +1,165 @@
-from typing import Annotated
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Annotated, Dict, Optional, Tuple
 
 import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from starlette import status
 
+from arithmetic.metrics import TOKEN_CACHE_REQUESTS
 from arithmetic.settings import settings
+from arithmetic.timing import Span
 from arithmetic.web.api.auth.schema import ValidatedUser
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 BEARER = "Bearer"
 
+token_cache_hits = TOKEN_CACHE_REQUESTS.labels("hit")
+token_cache_misses = TOKEN_CACHE_REQUESTS.labels("miss")
+
 jwt_error = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail="Could not validate user",
 )
 
 
+class VerifiedTokenCache:
+    """
+    Process-wide LRU cache of tokens that passed verification.
+
+    Entries are keyed by the SHA-256 digest of the token, so raw tokens are
+    never kept in memory, and expire at the exp claim of the token. Tokens
+    without one are never cached.
+
+    Revoked tokens are kept in a denylist, by digest too, until they expire,
+    and get_current_user rejects them before looking at the cache or
+    decoding them. The denylist lives in the process that revoked the token,
+    so under gunicorn the other workers keep accepting it until it expires.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.entries: OrderedDict[bytes, Tuple[ValidatedUser, float]] = OrderedDict()
+        # Digests of revoked tokens and the timestamp they expire at
+        self.revoked: Dict[bytes, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, token: str) -> Optional[ValidatedUser]:
+        """
+        Get the user of a verified token.
+
+        :param token: raw token.
+        :return: the user, None if the token isn't cached or has expired.
+        """
+        key = self._key(token)
+        entry = self.entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            token_cache_misses.inc()
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        token_cache_hits.inc()
+        return entry[0]
+
+    def put(self, token: str, user: ValidatedUser, expires_at: float) -> None:
+        """
+        Cache a verified token.
+
+        :param token: raw token.
+        :param user: user the token belongs to.
+        :param expires_at: timestamp of the exp claim of the token.
+        """
+        key = self._key(token)
+        self.entries[key] = (user, expires_at)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def revoke(self, token: str) -> None:
+        """
+        Reject a token from now on, in this process, until it expires.
+
+        :param token: raw token.
+        """
+        try:
+            payload = jwt.decode(
+                token,
+                settings.secret_key,
+                algorithms=[settings.algorithm],
+            )
+        except jwt.InvalidTokenError:
+            # Expired or invalid, it is rejected anyway
+            return
+        now = time.time()
+        for key, expires_at in list(self.revoked.items()):
+            if expires_at <= now:
+                del self.revoked[key]
+        key = self._key(token)
+        self.entries.pop(key, None)
+        self.revoked[key] = payload.get("exp", math.inf)
+
+    def is_revoked(self, token: str) -> bool:
+        """
+        Check whether a token was revoked.
+
+        :param token: raw token.
+        :return: True if the token was revoked and has not expired yet.
+        """
+        if not self.revoked:
+            return False
+        return self.revoked.get(self._key(token), 0.0) > time.time()
+
+    def clear(self) -> None:
+        """Drop every cached token."""
+        self.entries.clear()
+
+    def _key(self, token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+
+token_cache = VerifiedTokenCache(max_size=settings.token_cache_size)
+
+
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_bearer)],
 ) -> ValidatedUser:
     """
     Gets a user from an OAuth token.
 
+    Tokens are verified once and then served from the token cache
+    until they expire, unless they were revoked.
+
     :param token: the users token.
     """
+    if token_cache.is_revoked(token):
+        raise jwt_error
+    user = token_cache.get(token)
+    if user is not None:
+        return user
     try:
-        payload = jwt.decode(
-            token,
-            settings.secret_key,
-            algorithms=[settings.algorithm],
-        )
+        with Span("jwt"):
+            payload = jwt.decode(
+                token,
+                settings.secret_key,
+                algorithms=[settings.algorithm],
+            )
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
-        return ValidatedUser(username=username, user_id=user_id)
+        user = ValidatedUser(username=username, user_id=user_id)
+        if "exp" in payload:
+            token_cache.put(token, user, payload["exp"])
+        return user
     except jwt.ExpiredSignatureError as err:
         raise jwt_error from err
     except jwt.InvalidTokenError as err:
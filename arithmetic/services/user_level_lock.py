@@ -1,23 +1,148 @@
+import time
+from abc import ABC, abstractmethod
 from asyncio import Lock
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncGenerator, Dict, List
 
+from fastapi import Depends
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
 
-class UserLevelLock:
+from arithmetic.db.dependencies import get_db_session
+from arithmetic.metrics import USER_LOCK_WAIT
+from arithmetic.settings import UserLockBackend, settings
+from arithmetic.timing import record_timing
+
+memory_lock_wait = USER_LOCK_WAIT.labels(UserLockBackend.MEMORY.value)
+advisory_lock_wait = USER_LOCK_WAIT.labels(UserLockBackend.ADVISORY.value)
+
+
+class UserLevelLock(ABC):
     """A Class to prevent several race conditions when performing operations."""
 
+    @abstractmethod
+    def hold(self, user_id: int) -> AsyncContextManager[None]:
+        """
+        Holds the lock of a user for the duration of the context.
+
+        :param user_id: id of the user.
+        """
+
+
+class _LockEntry:
+    """Lock of a single user and the number of coroutines holding or awaiting it."""
+
+    __slots__ = ("holders", "lock")
+
     def __init__(self) -> None:
-        self.locks: Dict[int, Lock] = {}
-        self.global_lock = Lock()
-
-    async def acquire(self, user_id: int) -> Lock:
-        """Acquires the lock."""
-        async with self.global_lock:
-            if user_id not in self.locks:
-                self.locks[user_id] = Lock()
-        return self.locks[user_id]
-
-    async def release(self, user_id: int) -> None:
-        """Releases the lock."""
-        async with self.global_lock:
-            if user_id in self.locks and not self.locks[user_id].locked():
-                del self.locks[user_id]
+        self.lock = Lock()
+        self.holders = 0
+
+
+class _HeldUserLock:
+    """Async context manager returned by InProcessUserLock.hold."""
+
+    __slots__ = ("entry", "shard", "user_id")
+
+    def __init__(self, shard: Dict[int, _LockEntry], user_id: int) -> None:
+        self.shard = shard
+        self.user_id = user_id
+
+    async def __aenter__(self) -> None:
+        # Counted only once entered, a context never entered holds nothing
+        entry = self.shard.get(self.user_id)
+        if entry is None:
+            entry = self.shard[self.user_id] = _LockEntry()
+        entry.holders += 1
+        self.entry = entry
+        start = time.perf_counter()
+        try:
+            await self.entry.lock.acquire()
+        except BaseException:
+            self._forget()
+            raise
+        elapsed = time.perf_counter() - start
+        memory_lock_wait.observe(elapsed)
+        record_timing("lock", elapsed)
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.entry.lock.release()
+        self._forget()
+
+    def _forget(self) -> None:
+        self.entry.holders -= 1
+        if not self.entry.holders:
+            del self.shard[self.user_id]
+
+
+class InProcessUserLock(UserLevelLock):
+    """
+    User lock backed by asyncio locks.
+
+    One instance is shared by the whole application, so it serializes
+    operations of a user inside a single worker process.
+
+    Locks are spread over striped shards and reference counted: an entry
+    only lives while some coroutine holds or awaits it, so memory is bounded
+    by the number of concurrent operations and not by the number of users.
+    Shards don't need a lock of their own, since the event loop never
+    switches tasks between looking an entry up and updating its count.
+    """
+
+    def __init__(self, shards: int = settings.user_lock_shards) -> None:
+        self.shards: List[Dict[int, _LockEntry]] = [{} for _ in range(shards)]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def hold(self, user_id: int) -> AsyncContextManager[None]:
+        """
+        Holds the lock of a user for the duration of the context.
+
+        :param user_id: id of the user.
+        """
+        return _HeldUserLock(self.shards[user_id % len(self.shards)], user_id)
+
+
+class AdvisoryUserLock(UserLevelLock):
+    """
+    User lock backed by postgres transaction-level advisory locks.
+
+    The lock is taken in the transaction of the current session and
+    is released by postgres when that transaction commits or rolls back,
+    so it serializes operations of a user across every worker.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    @asynccontextmanager
+    async def hold(self, user_id: int) -> AsyncGenerator[None, None]:
+        """
+        Holds the lock of a user until the current transaction ends.
+
+        :param user_id: id of the user.
+        """
+        start = time.perf_counter()
+        await self.session.execute(select(func.pg_advisory_xact_lock(user_id)))
+        elapsed = time.perf_counter() - start
+        advisory_lock_wait.observe(elapsed)
+        record_timing("lock", elapsed)
+        yield
+
+
+def get_user_lock(
+    request: Request,
+    session: AsyncSession = Depends(get_db_session),
+) -> UserLevelLock:
+    """
+    Get the user lock configured for the application.
+
+    :param request: current request.
+    :param session: database session of the request.
+    :return: user lock.
+    """
+    if settings.user_lock_backend == UserLockBackend.ADVISORY:
+        return AdvisoryUserLock(session)
+    return request.app.state.user_lock
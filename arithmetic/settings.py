@@ -1,6 +1,7 @@
 import enum
 from pathlib import Path
 from tempfile import gettempdir
+from typing import List
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from yarl import URL
@@ -19,6 +20,13 @@ class LogLevel(str, enum.Enum):
     FATAL = "FATAL"
 
 
+class UserLockBackend(str, enum.Enum):
+    """Possible backends for the per-user operation lock."""
+
+    MEMORY = "memory"
+    ADVISORY = "advisory"
+
+
 class Settings(BaseSettings):
     """
     Application settings.
@@ -38,6 +46,27 @@ class Settings(BaseSettings):
     environment: str = "dev"
 
     log_level: LogLevel = LogLevel.INFO
+    # Directory where the workers share their prometheus metrics,
+    # it is emptied when the application starts
+    prometheus_dir: Path = TEMP_DIR / "prom"
+    # Send the time spent in each phase of a request in a Server-Timing
+    # header, which discloses it to clients, and log it as well
+    server_timing: bool = True
+    server_timing_log: bool = False
+    # Secret of the on-demand profiler, sent in the X-Profiler-Token header.
+    # While it is empty the profiler is disabled and costs nothing
+    profiler_token: str = ""
+    # Seconds between two stack samples, and longest sampling of a worker
+    profiler_interval: float = 0.005
+    profiler_max_seconds: float = 60.0
+    # Measure the lag of the event loop every loop_monitor_interval seconds,
+    # and log the stack of any callback blocking it for longer than
+    # loop_monitor_threshold seconds
+    loop_monitor: bool = True
+    loop_monitor_interval: float = 0.05
+    loop_monitor_threshold: float = 0.1
+    # Last lags the percentiles are computed on
+    loop_monitor_samples: int = 1200
     # Variables for the database
     db_host: str = "localhost"
     db_port: int = 5432
@@ -45,10 +74,103 @@ class Settings(BaseSettings):
     db_pass: str = "arithmetic"
     db_base: str = "arithmetic"
     db_echo: bool = False
+    # Connections each worker keeps open, extra ones it opens under load,
+    # and seconds a request waits for a connection before failing
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # Seconds after which a connection is replaced, -1 keeps them
+    db_pool_recycle: int = -1
+    # Check connections with a round trip every time they are checked out
+    db_pool_pre_ping: bool = False
+    # Open the db_pool_size connections at startup
+    db_pool_prewarm: bool = True
+    # Prepared statements cached per connection,
+    # 0 is needed behind pgbouncer in transaction mode
+    db_statement_cache_size: int = 100
+    # URLs of the read replicas serving record listings and searches
+    db_replica_urls: List[str] = []
+    # Replicas further behind the primary, in seconds, or unreachable
+    # are skipped, and reads go to the primary when none is left
+    db_replica_max_lag: float = 5.0
+    # Seconds between two measures of the replication lag
+    db_replica_check_interval: float = 1.0
 
     secret_key: str = ""
     algorithm: str = "HS256"
+    # Verified tokens kept in memory, so requests skip decoding them
+    token_cache_size: int = 10000
+    # Cost factor of new password hashes, each step doubles the work
+    bcrypt_rounds: int = 12
+    # Threads hashing passwords, calls waiting for or using them,
+    # and seconds a call waits for a slot before answering 503
+    bcrypt_workers: int = 2
+    bcrypt_max_pending: int = 8
+    bcrypt_queue_timeout: float = 1.0
     random: str = ""
+    random_url: str = "https://api.random.org/json-rpc/4/invoke"
+    # Strings requested from random.org per call when refilling the buffer
+    random_batch_size: int = 100
+    # The buffer is refilled up to the high watermark
+    # once it drops to the low watermark
+    random_buffer_low_watermark: int = 20
+    random_buffer_high_watermark: int = 200
+    random_max_connections: int = 10
+    # Seconds a randomString operation waits for random.org
+    random_timeout: float = 2.0
+    # Consecutive failures that open the random.org circuit breaker,
+    # and seconds it stays open before letting a trial call through
+    random_failure_threshold: int = 5
+    random_reset_timeout: float = 30.0
+    # Generate strings locally with the secrets module while random.org is down
+    random_local_fallback: bool = True
+
+    # "memory" only serializes operations inside one worker,
+    # "advisory" uses postgres advisory locks and works across workers
+    user_lock_backend: UserLockBackend = UserLockBackend.MEMORY
+    # Number of shards the in-process user lock spreads its locks over
+    user_lock_shards: int = 64
+
+    # Maximum number of operations accepted by the batch endpoint
+    operation_batch_max_size: int = 500
+
+    # Commit the debits and records of concurrent operations together,
+    # every group_commit_max_delay seconds or group_commit_max_batch writes
+    group_commit: bool = False
+    group_commit_max_batch: int = 100
+    group_commit_max_delay: float = 0.005
+
+    # Compress JSON responses of the operation router of at least
+    # response_gzip_min_size bytes for clients that accept gzip
+    response_gzip: bool = True
+    response_gzip_min_size: int = 4096
+    response_gzip_level: int = 5
+
+    # Records fetched per round trip while exporting the history of a user
+    export_batch_size: int = 1000
+
+    # Seconds the in-memory operation catalog is trusted before reloading it
+    operation_catalog_ttl: int = 300
+
+    # Limits of the expressions accepted by the expression operation:
+    # characters of the text, nesting depth and nodes of the compiled tree
+    expression_max_length: int = 200
+    expression_max_depth: int = 20
+    expression_max_nodes: int = 64
+    # Compiled expressions kept in memory, keyed by their normalized text
+    expression_cache_size: int = 1024
+
+    # Operands with more digits are rejected, it must stay below
+    # the 4300 digits the interpreter accepts when parsing integers
+    operand_max_digits: int = 4000
+    # Operations whose result may take more bits run in a process pool,
+    # smaller ones are computed inline on the event loop
+    arithmetic_inline_max_bits: int = 20000
+    arithmetic_workers: int = 2
+    # Offloaded operations waiting for or running in the pool,
+    # and seconds they have to finish
+    arithmetic_max_pending: int = 16
+    arithmetic_timeout: float = 5.0
 
     @property
     def db_url(self) -> URL:
@@ -0,0 +1,62 @@
+"""
+Request-scoped timing spans.
+
+ServerTimingMiddleware gives every request a dict of durations in a
+context variable. Spans add the time spent in a phase, such as waiting
+for the user lock or committing, to the entry of that phase, and the
+middleware sends them in the Server-Timing header of the response.
+Outside of a request, as in the flusher of the group committer, spans
+record nothing.
+
+A span costs two perf_counter calls and a context variable lookup,
+about a microsecond, so they stay on for every request.
+"""
+
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, Optional
+
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings",
+    default=None,
+)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """
+    Add time spent in a phase of the current request.
+
+    :param name: name of the phase.
+    :param seconds: time spent in it.
+    """
+    timings = request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """
+    Format timings as the value of a Server-Timing header.
+
+    :param timings: seconds spent in each phase.
+    :return: header value, with durations in milliseconds.
+    """
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items()
+    )
+
+
+class Span:
+    """Context manager adding the time spent in its block to a phase."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        record_timing(self.name, perf_counter() - self.start)
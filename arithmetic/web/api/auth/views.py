@@ -1,16 +1,15 @@
 from datetime import timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Response
-from passlib.context import CryptContext
 from starlette import status
 
 from arithmetic.db.dao.user_dao import UserDAO
+from arithmetic.services.password_hasher import PasswordHasher, get_password_hasher
 from arithmetic.services.security_utils import create_access_token
 from arithmetic.web.api.auth.schema import Token, UserRequest
 
 router = APIRouter()
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 BEARER = "Bearer"
 
 
@@ -18,14 +17,16 @@ BEARER = "Bearer"
 async def create_user(
     new_user: UserRequest,
     user_dao: UserDAO = Depends(),
+    password_hasher: PasswordHasher = Depends(get_password_hasher),
 ) -> None:
     """
     Creates a new user in the database.
 
     :param new_user: new user model.
     :param user_dao: DAO for user models.
+    :param password_hasher: hasher that runs bcrypt off the event loop.
     """
-    hashed_password = bcrypt_context.hash(new_user.password)
+    hashed_password = await password_hasher.hash(new_user.password)
     await user_dao.create_user(new_user.username, hashed_password)
 
 
@@ -39,15 +40,20 @@ async def preflight_token() -> Response:
 async def login_for_access_token(
     login_user: UserRequest,
     user_dao: UserDAO = Depends(),
+    password_hasher: PasswordHasher = Depends(get_password_hasher),
 ) -> Token:
     """
     Create a new user in the database.
 
     :param new_user: new user model.
     :param user_dao: DAO for user models.
+    :param password_hasher: hasher that runs bcrypt off the event loop.
     """
     user = await user_dao.get_user(login_user.username)
-    if not user or not bcrypt_context.verify(login_user.password, user.password):
+    if not user or not await password_hasher.verify(
+        login_user.password,
+        user.password,
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate user",
@@ -0,0 +1,50 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class RandomProviderDTO(BaseModel):
+    """DTO that represents the state of the random string provider."""
+
+    state: str
+    failures: int
+    fallback_enabled: bool
+
+
+class DBPoolDTO(BaseModel):
+    """DTO that represents the state of the database connection pool."""
+
+    size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    waiting: int
+    checkouts: int
+    timeouts: int
+    wait_time: float
+    max_wait_time: float
+
+
+class LoopStallDTO(BaseModel):
+    """DTO that represents a callback that blocked the event loop."""
+
+    # Unix timestamp of when the watchdog caught it
+    detected_at: float
+    # None while the loop is still blocked
+    lag: Optional[float]
+    stack: str
+
+
+class LoopLagDTO(BaseModel):
+    """DTO that represents the lag of the event loop, in seconds."""
+
+    interval: float
+    threshold: float
+    samples: int
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    blocked: int
+    stalls: List[LoopStallDTO]
@@ -1,4 +1,33 @@
-from fastapi import APIRouter
+import asyncio
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette import status
+
+from arithmetic.db.dependencies import get_db_pool
+from arithmetic.db.engine import InstrumentedPool
+from arithmetic.metrics import generate_metrics
+from arithmetic.services.loop_monitor import LoopLagMonitor, get_loop_monitor
+from arithmetic.services.profiler import (
+    StackSampler,
+    profiler_busy_error,
+    profiler_lock,
+    require_profiler_token,
+)
+from arithmetic.services.random_service import (
+    ResilientRandomStrings,
+    get_random_strings,
+)
+from arithmetic.settings import settings
+from arithmetic.web.api.monitoring.schema import (
+    DBPoolDTO,
+    LoopLagDTO,
+    LoopStallDTO,
+    RandomProviderDTO,
+)
 
 router = APIRouter()
 
@@ -10,3 +39,127 @@ def health_check() -> None:
 
     It returns 200 if the project is healthy.
     """
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """
+    Exposes the metrics of every worker in the prometheus text format.
+
+    :return: response with the metrics.
+    """
+    return Response(generate_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/health/random")
+def random_provider_status(
+    random_strings: ResilientRandomStrings = Depends(get_random_strings),
+) -> RandomProviderDTO:
+    """
+    Reports the circuit breaker of the random string provider.
+
+    :param random_strings: random string provider.
+    :return: state of the circuit breaker.
+    """
+    return RandomProviderDTO(
+        state=random_strings.breaker.state.value,
+        failures=random_strings.breaker.failures,
+        fallback_enabled=random_strings.fallback is not None,
+    )
+
+
+@router.get("/health/db")
+def db_pool_status(pool: InstrumentedPool = Depends(get_db_pool)) -> DBPoolDTO:
+    """
+    Reports the connection pool of the worker.
+
+    Each worker has its own pool, so the numbers
+    are those of the worker that answered.
+
+    :param pool: connection pool.
+    :return: connections of the pool and statistics of its checkouts.
+    """
+    return DBPoolDTO(
+        size=pool.size(),
+        max_overflow=pool.max_overflow,
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        # Negative while the pool holds fewer connections than its size
+        overflow=max(pool.overflow(), 0),
+        waiting=pool.waiting,
+        checkouts=pool.checkouts,
+        timeouts=pool.timeouts,
+        wait_time=pool.wait_time,
+        max_wait_time=pool.max_wait_time,
+    )
+
+
+@router.get("/health/loop")
+def loop_lag_status(
+    loop_monitor: Optional[LoopLagMonitor] = Depends(get_loop_monitor),
+) -> LoopLagDTO:
+    """
+    Reports the lag of the event loop of the worker.
+
+    Percentiles cover the last lags measured by the worker that answered,
+    and stalls are the last callbacks that blocked its loop, newest first.
+
+    :param loop_monitor: event loop monitor.
+    :return: lag percentiles and stalls.
+    """
+    if loop_monitor is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The event loop monitor is disabled.",
+        )
+    return LoopLagDTO(
+        interval=loop_monitor.interval,
+        threshold=loop_monitor.threshold,
+        samples=len(loop_monitor.lags),
+        blocked=loop_monitor.blocked,
+        stalls=[
+            LoopStallDTO(
+                detected_at=stall.detected_at,
+                lag=stall.lag,
+                stack=stall.stack,
+            )
+            for stall in reversed(loop_monitor.stalls)
+        ],
+        **loop_monitor.percentiles(),
+    )
+
+
+@router.get(
+    "/profile",
+    include_in_schema=False,
+    dependencies=[Depends(require_profiler_token)],
+)
+async def profile_worker(
+    seconds: float = Query(gt=0, le=settings.profiler_max_seconds),
+    loop_only: bool = False,
+) -> PlainTextResponse:
+    """
+    Samples the stacks of the worker that answers for a while.
+
+    Only allowed with the profiler token in the X-Profiler-Token header.
+
+    :param seconds: how long to sample.
+    :param loop_only: sample the event loop thread only,
+        instead of every thread of the worker.
+    :return: collapsed stacks, ready for a flamegraph.
+    """
+    if profiler_lock.locked():
+        raise profiler_busy_error
+    async with profiler_lock:
+        sampler = StackSampler(
+            thread_ids=[threading.get_ident()] if loop_only else None,
+        )
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={"X-Profile-Samples": str(sampler.samples)},
+    )
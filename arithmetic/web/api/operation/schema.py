@@ -1,7 +1,13 @@
 from enum import Enum
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from arithmetic.services.expression import compile_expression
+from arithmetic.settings import settings
+
+# Smallest absolute value with more digits than operands may have
+OPERAND_LIMIT = 10**settings.operand_max_digits
 
 
 class OperationEnum(str, Enum):
@@ -13,6 +19,14 @@ class OperationEnum(str, Enum):
     DIVISION = "division"
     SQUARE = "squareRoot"
     RANDOM = "randomString"
+    EXPRESSION = "expression"
+
+
+class ExportFormat(str, Enum):
+    """Formats of the record export."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
 
 
 class OperationDTO(BaseModel):
@@ -38,7 +52,20 @@ class RecordsDTO(BaseModel):
     """DTO that represents a list of records."""
 
     records: List[RecordDTO]
-    total_count: int
+    # None when the count was not requested
+    total_count: Optional[int]
+    # Opaque cursor of the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
+class OperationResultDTO(BaseModel):
+    """DTO that represents the result of one operation of a batch."""
+
+    type: OperationEnum
+    result: str
+    cost: int
+    # Balance of the user right after this operation
+    user_balance: int
 
 
 class OperationBase(BaseModel):
@@ -47,6 +74,34 @@ class OperationBase(BaseModel):
     type: OperationEnum
     first_term: Optional[int] = Field(None)
     second_term: Optional[int] = Field(None)
+    # Formula such as "(a+b)*sqrt(c)", only for expression operations
+    expression: Optional[str] = Field(None, max_length=settings.expression_max_length)
+    variables: Optional[Dict[str, int]] = Field(None)
+
+    @field_validator("first_term", "second_term")
+    @classmethod
+    def check_term_size(cls, term: Optional[int]) -> Optional[int]:
+        """Validates that a term has no more digits than allowed."""
+        if term is not None and abs(term) >= OPERAND_LIMIT:
+            raise ValueError(
+                f"Terms can't have more than {settings.operand_max_digits} digits.",
+            )
+        return term
+
+    @field_validator("variables")
+    @classmethod
+    def check_variable_sizes(
+        cls,
+        variables: Optional[Dict[str, int]],
+    ) -> Optional[Dict[str, int]]:
+        """Validates that no variable has more digits than allowed."""
+        for name, value in (variables or {}).items():
+            if abs(value) >= OPERAND_LIMIT:
+                raise ValueError(
+                    f"Variable '{name}' can't have more than "
+                    f"{settings.operand_max_digits} digits.",
+                )
+        return variables
 
     @model_validator(mode="after")
     def check_terms(self, values: Any) -> Any:
@@ -55,6 +110,8 @@ class OperationBase(BaseModel):
         first_term = self.first_term
         second_term = self.second_term
 
+        if type_ == OperationEnum.EXPRESSION:
+            return self
         if type_ in {
             OperationEnum.ADDITION,
             OperationEnum.SUBTRACTION,
@@ -92,3 +149,30 @@ class OperationBase(BaseModel):
                 f"For operation type '{type_}', no terms are required.",
             )
         return self
+
+    @model_validator(mode="after")
+    def check_expression(self, values: Any) -> Any:
+        """Validates the expression, compiling it, of expression operations."""
+        if self.type != OperationEnum.EXPRESSION:
+            if self.expression is not None or self.variables is not None:
+                raise ValueError(
+                    f"For operation type '{self.type}',"
+                    f"expression and variables should not be provided.",
+                )
+            return self
+        if self.first_term is not None or self.second_term is not None:
+            raise ValueError(
+                f"For operation type '{self.type}', no terms are required.",
+            )
+        if self.expression is None:
+            raise ValueError(
+                f"For operation type '{self.type}',expression is required.",
+            )
+        compiled = compile_expression(self.expression)
+        missing = compiled.variables - (self.variables or {}).keys()
+        if missing:
+            raise ValueError(
+                f"For operation type '{self.type}',"
+                f"missing variables: {', '.join(sorted(missing))}.",
+            )
+        return self
@@ -1,13 +1,27 @@
-from typing import List
+from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends
+from fastapi.responses import Response, StreamingResponse
 from starlette import status
 
+from arithmetic.db.dao.record_response import CountMode
 from arithmetic.services.operation_service import OperationService
-from arithmetic.services.record_service import RecordService
+from arithmetic.services.record_export_service import (
+    MEDIA_TYPES,
+    RecordExportService,
+)
+from arithmetic.services.record_service import RecordService, get_record_reader
 from arithmetic.services.security_service import user_dependency
 from arithmetic.services.user_service import UserService
-from arithmetic.web.api.operation.schema import OperationBase, RecordDTO, RecordsDTO
+from arithmetic.settings import settings
+from arithmetic.web.api.operation.schema import (
+    ExportFormat,
+    OperationBase,
+    OperationResultDTO,
+    RecordDTO,
+    RecordsDTO,
+)
+from arithmetic.web.responses import DTOSerializer
 
 router = APIRouter()
 
@@ -29,50 +43,129 @@ async def new_operation(
         new_operation.type,
         new_operation.first_term,
         new_operation.second_term,
+        new_operation.expression,
+        new_operation.variables,
     )
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
+@router.post(
+    "/batch",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[OperationResultDTO],
+)
+async def new_operations(
+    operations: Annotated[
+        List[OperationBase],
+        Body(min_length=1, max_length=settings.operation_batch_max_size),
+    ],
+    validated_user: user_dependency,
+    operation_service: OperationService = Depends(),
+    serializer: DTOSerializer = Depends(),
+) -> Response:
+    """
+    Create and record several operations in one transaction.
+
+    Every operation is validated before any is performed, and the user
+    is billed once for all of them.
+
+    :param operations: operations to perform.
+    :return: result of each operation, in the same order.
+    """
+    results = await operation_service.perform_operations(
+        validated_user.user_id,
+        operations,
+    )
+    return serializer.response(
+        List[OperationResultDTO],
+        results,
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=RecordsDTO)
 async def get_records(
     validated_user: user_dependency,
     limit: int = 10,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.ESTIMATE,
     user_service: UserService = Depends(),
-    record_service: RecordService = Depends(),
-) -> RecordsDTO:
+    record_service: RecordService = Depends(get_record_reader),
+    serializer: DTOSerializer = Depends(),
+) -> Response:
     """
-    Create and record a new operation.
+    Get a page of the records of the user.
 
-    :param operation_dao: DAO for operation models.
-    :return: list of operation objects from database.
+    Pages can be requested with limit/offset, or by passing the
+    `next_cursor` of the previous page as `cursor`.
+    The total count is read from a counter kept on the user by default,
+    `count=exact` counts the records and `count=none` skips it.
+
+    :param cursor: cursor returned with the previous page.
+    :param count: how the total count is computed.
+    :return: page of records.
     """
     user = await user_service.get_user_by_id(validated_user.user_id)
-    return await record_service.get_records(
+    page = await record_service.get_records(
         user_id=user.id,
         limit=limit,
         offset=offset,
+        cursor=cursor,
+        count=count,
+    )
+    return serializer.response(RecordsDTO, page)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_records(
+    validated_user: user_dependency,
+    format: ExportFormat = ExportFormat.NDJSON,
+    export_service: RecordExportService = Depends(),
+) -> StreamingResponse:
+    """
+    Export every record of the user, newest first.
+
+    Records are streamed as NDJSON, one object per line, or CSV
+    with a header row, while they are read from the database.
+
+    :param format: format of the export.
+    :return: streaming response with the records.
+    """
+    return StreamingResponse(
+        export_service.export(validated_user.user_id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="records.{format.value}"',
+        },
     )
 
 
-@router.get("/search/{term}", status_code=status.HTTP_200_OK)
+@router.get(
+    "/search/{term}",
+    status_code=status.HTTP_200_OK,
+    response_model=List[RecordDTO],
+)
 async def search_records(
     validated_user: user_dependency,
     term: str,
     limit: int = 10,
     offset: int = 0,
-    record_service: RecordService = Depends(),
-) -> List[RecordDTO]:
+    record_service: RecordService = Depends(get_record_reader),
+    serializer: DTOSerializer = Depends(),
+) -> Response:
     """
-    Create and record a new operation.
+    Search the records of the user.
 
-    :param operation_dao: DAO for operation models.
-    :return: list of operation objects from database.
+    :param term: text searched in the operation of the records.
+    :return: matching records, newest first.
     """
-    return await record_service.search(
+    records = await record_service.search(
+        user_id=validated_user.user_id,
         term=term,
         limit=limit,
         offset=offset,
     )
+    return serializer.response(List[RecordDTO], records)
 
 
 @router.delete("/{record_id}", status_code=status.HTTP_200_OK)
@@ -6,8 +6,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import UJSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from arithmetic.services.profiler import profiling_enabled
 from arithmetic.web.api.router import api_router
 from arithmetic.web.lifespan import lifespan_setup
+from arithmetic.web.middleware import (
+    MetricsMiddleware,
+    ProfilerMiddleware,
+    ServerTimingMiddleware,
+)
 
 APP_ROOT = Path(__file__).parent.parent
 
@@ -43,6 +49,10 @@ def get_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(ServerTimingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    if profiling_enabled():
+        app.add_middleware(ProfilerMiddleware)
 
     # Main router for the API.
     app.include_router(router=api_router, prefix="/api")
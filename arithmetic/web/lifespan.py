@@ -1,23 +1,42 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+import httpx
 from fastapi import FastAPI
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from arithmetic.db.dao.operation_catalog import operation_catalog
+from arithmetic.db.engine import create_engine, prewarm_pool
+from arithmetic.db.replicas import ReplicaRouter
+from arithmetic.services.arithmetic_executor import ArithmeticExecutor
+from arithmetic.services.group_commit import GroupCommitter
+from arithmetic.services.loop_monitor import LoopLagMonitor
+from arithmetic.services.password_hasher import PasswordHasher
+from arithmetic.services.random_service import (
+    LocalRandomStrings,
+    RandomStringBuffer,
+    ResilientRandomStrings,
+)
+from arithmetic.services.user_level_lock import InProcessUserLock
 from arithmetic.settings import settings
 
 
-def _setup_db(app: FastAPI) -> None:  # pragma: no cover
+async def _setup_db(app: FastAPI) -> None:  # pragma: no cover
     """
     Creates connection to the database.
 
     This function creates SQLAlchemy engine instance,
     session_factory for creating sessions
     and stores them in the application's state property.
+    The connections of the pool are opened before the first request.
 
     :param app: fastAPI application.
     """
-    engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
+    engine = create_engine()
+    if settings.db_pool_prewarm:
+        await prewarm_pool(engine, settings.db_pool_size)
     session_factory = async_sessionmaker(
         engine,
         expire_on_commit=False,
@@ -26,6 +45,135 @@ def _setup_db(app: FastAPI) -> None:  # pragma: no cover
     app.state.db_session_factory = session_factory
 
 
+async def _setup_db_replicas(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Creates the router of read-only sessions, if replicas are configured.
+
+    The lag of the replicas is measured once before the first request,
+    then by a background task.
+
+    :param app: fastAPI application.
+    """
+    if not settings.db_replica_urls:
+        return
+    engines = [create_engine(url) for url in settings.db_replica_urls]
+    if settings.db_pool_prewarm:
+        for engine in engines:
+            await prewarm_pool(engine, settings.db_pool_size)
+    router = ReplicaRouter(engines)
+    await router.check()
+    router.start()
+    app.state.db_replica_router = router
+
+
+async def _setup_operation_catalog(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Loads the operation catalog.
+
+    Operations are kept in memory so billed requests
+    don't have to query the operations table.
+
+    :param app: fastAPI application.
+    """
+    async with app.state.db_session_factory() as session:
+        await operation_catalog.load(session)
+
+
+def _setup_user_lock(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Creates the in-process user lock.
+
+    The lock has to be shared by every request,
+    otherwise it doesn't serialize anything.
+
+    :param app: fastAPI application.
+    """
+    app.state.user_lock = InProcessUserLock()
+
+
+def _setup_random(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Creates the random string provider.
+
+    Strings are buffered from random.org with a long-lived,
+    pooled client, and generated locally while random.org is down.
+
+    :param app: fastAPI application.
+    """
+    client = httpx.AsyncClient(
+        timeout=settings.random_timeout,
+        limits=httpx.Limits(max_connections=settings.random_max_connections),
+    )
+    random_buffer = RandomStringBuffer(client)
+    random_buffer.start()
+    app.state.random_client = client
+    app.state.random_buffer = random_buffer
+    app.state.random_strings = ResilientRandomStrings(
+        random_buffer,
+        fallback=LocalRandomStrings() if settings.random_local_fallback else None,
+    )
+
+
+def _setup_arithmetic(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Creates the process pool for arithmetic on large operands.
+
+    Workers are spawned rather than forked, since the parent
+    already runs an event loop and other threads.
+
+    :param app: fastAPI application.
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=settings.arithmetic_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    app.state.arithmetic_pool = pool
+    app.state.arithmetic_executor = ArithmeticExecutor(pool)
+
+
+def _setup_password_hasher(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Creates the password hasher.
+
+    bcrypt runs in its own small thread pool, so a burst of logins
+    can't take the default executor nor the event loop.
+
+    :param app: fastAPI application.
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=settings.bcrypt_workers,
+        thread_name_prefix="bcrypt",
+    )
+    app.state.password_executor = executor
+    app.state.password_hasher = PasswordHasher(executor)
+
+
+def _setup_group_commit(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Starts the group committer, if group commit is enabled.
+
+    :param app: fastAPI application.
+    """
+    if not settings.group_commit:
+        return
+    group_committer = GroupCommitter(app.state.db_session_factory)
+    group_committer.start()
+    app.state.group_committer = group_committer
+
+
+def _setup_loop_monitor(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Starts the event loop monitor, if it is enabled.
+
+    :param app: fastAPI application.
+    """
+    if not settings.loop_monitor:
+        return
+    loop_monitor = LoopLagMonitor()
+    loop_monitor.start()
+    app.state.loop_monitor = loop_monitor
+
+
 @asynccontextmanager
 async def lifespan_setup(
     app: FastAPI,
@@ -41,8 +189,26 @@ async def lifespan_setup(
     """
 
     app.middleware_stack = None
-    _setup_db(app)
+    await _setup_db(app)
+    await _setup_db_replicas(app)
+    await _setup_operation_catalog(app)
+    _setup_user_lock(app)
+    _setup_random(app)
+    _setup_arithmetic(app)
+    _setup_password_hasher(app)
+    _setup_group_commit(app)
+    _setup_loop_monitor(app)
     app.middleware_stack = app.build_middleware_stack()
 
     yield
+    if settings.loop_monitor:
+        await app.state.loop_monitor.stop()
+    if settings.group_commit:
+        await app.state.group_committer.stop()
+    await app.state.random_buffer.stop()
+    await app.state.random_client.aclose()
+    app.state.arithmetic_pool.shutdown(cancel_futures=True)
+    app.state.password_executor.shutdown(cancel_futures=True)
+    if settings.db_replica_urls:
+        await app.state.db_replica_router.stop()
     await app.state.db_engine.dispose()
@@ -0,0 +1,189 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from arithmetic.metrics import REQUEST_DURATION
+from arithmetic.services.profiler import (
+    StackSampler,
+    check_profiler_token,
+    profiler_busy_error,
+    profiler_lock,
+)
+from arithmetic.settings import settings
+from arithmetic.timing import format_server_timing, request_timings
+
+logger = logging.getLogger(__name__)
+
+
+def route_name(scope: Scope) -> str:
+    """
+    Get the path template of the route that served a request.
+
+    Templates keep the route label bounded, where raw paths
+    would add a label value per record id or search term.
+
+    :param scope: scope of the request, once it was routed.
+    :return: path template of the API route, "unmatched" for anything else,
+        such as static files or unknown paths.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    return route.path
+
+
+class MetricsMiddleware:
+    """
+    Records the duration of every HTTP request, by route and status.
+
+    It is a plain ASGI middleware rather than a BaseHTTPMiddleware,
+    which would run the application in a task of its own and pass every
+    chunk of the response through a stream. The duration goes up to the
+    last byte of the response, which for an export is when the stream ends.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request and record how long it took."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.labels(
+                scope["method"],
+                route_name(scope),
+                str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """
+    Sends the time spent in each phase of a request in a Server-Timing header.
+
+    Phases are timed by spans, see arithmetic.timing, and "total" is the
+    time until the response started. Phases that end after the response
+    started, such as the stream of an export, are only logged.
+    With server_timing_log set, every request also logs its timings
+    as a line of JSON.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request with its timings, and add them to the response."""
+        if scope["type"] != "http" or not settings.server_timing:
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        reset_token = request_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timings(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timings["total"] = time.perf_counter() - start
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    format_server_timing(timings),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_timings.reset(reset_token)
+            if settings.server_timing_log:
+                logger.info(
+                    "Server timing %s",
+                    json.dumps(
+                        {
+                            "method": scope["method"],
+                            "route": route_name(scope),
+                            "status": status_code,
+                            "timings": {
+                                name: round(seconds * 1000, 3)
+                                for name, seconds in timings.items()
+                            },
+                        },
+                    ),
+                )
+
+
+class ProfilerMiddleware:
+    """
+    Profiles single requests sent with an X-Profile header.
+
+    The request must also carry the profiler token. While it is served,
+    the stacks of the event loop thread are sampled, and the response is
+    replaced by the collapsed stacks, with the status it would have had in
+    an X-Profiled-Status header. Other requests served by the worker at the
+    same time show up in the samples too.
+
+    The middleware is only installed while profiling is enabled.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request, profiling it when asked to."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if "x-profile" not in headers:
+            await self.app(scope, receive, send)
+            return
+        try:
+            check_profiler_token(headers.get("x-profiler-token"))
+            if profiler_lock.locked():
+                raise profiler_busy_error
+        except HTTPException as err:
+            response = PlainTextResponse(err.detail, status_code=err.status_code)
+            await response(scope, receive, send)
+            return
+        async with profiler_lock:
+            sampler = StackSampler(thread_ids=[threading.get_ident()])
+            status_code = 500
+
+            async def discard(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+
+            sampler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                sampler.stop()
+        response = PlainTextResponse(
+            sampler.collapsed(),
+            headers={
+                "X-Profiled-Status": str(status_code),
+                "X-Profile-Samples": str(sampler.samples),
+            },
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,87 @@
+"""
+Measures event loop lag while operations on large operands are served.
+
+A heartbeat coroutine sleeps for a millisecond over and over and records
+how late it wakes up, which is the extra latency every other request in the
+worker would see. Meanwhile a stream of expression operations with
+4000-digit variables is computed, first inline and then through the
+ArithmeticExecutor and its process pool.
+
+Run it with:
+
+    python -m benchmarks.event_loop
+"""
+
+import asyncio
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from arithmetic.services.arithmetic_executor import ArithmeticExecutor
+from arithmetic.services.expression import compile_expression
+
+REQUESTS = 40
+CONCURRENCY = 4
+HEARTBEAT = 0.001
+EXPRESSION = compile_expression("*".join(["a"] * 12) + " + b")
+VARIABLES = {"a": 10**3999 - 7, "b": 1}
+
+
+async def _heartbeat(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - start - HEARTBEAT)
+
+
+async def _client(executor: ArithmeticExecutor, requests: int) -> None:
+    for _ in range(requests):
+        await executor.evaluate(EXPRESSION, VARIABLES)
+        # Give the heartbeat a chance, like the I/O of a real request would
+        await asyncio.sleep(0)
+
+
+async def _measure(name: str, executor: ArithmeticExecutor) -> None:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(_client(executor, REQUESTS // CONCURRENCY) for _ in range(CONCURRENCY)),
+    )
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat
+    lags.sort()
+    print(  # noqa: T201
+        f"{name:>8}: {REQUESTS / elapsed:>7.1f} ops/s, loop lag "
+        f"p50 {statistics.median(lags) * 1000:>7.2f} ms, "
+        f"p99 {lags[int(len(lags) * 0.99)] * 1000:>7.2f} ms, "
+        f"max {lags[-1] * 1000:>7.2f} ms",
+    )
+
+
+async def main() -> None:
+    """Runs the benchmark inline and with the process pool."""
+    print(  # noqa: T201
+        f"{REQUESTS} expressions of up to "
+        f"{EXPRESSION.result_bits(VARIABLES)} bits, "
+        f"{CONCURRENCY} concurrent clients",
+    )
+    await _measure("inline", ArithmeticExecutor(None))
+    with ProcessPoolExecutor(
+        max_workers=CONCURRENCY,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        # Spawn the workers before measuring
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(pool, time.sleep, 0.1) for _ in range(CONCURRENCY)),
+        )
+        await _measure("offload", ArithmeticExecutor(pool, timeout=60))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Measures operation latency during a login storm.
+
+Operation requests arrive at a steady rate while a burst of logins verifies
+bcrypt hashes, first inline on the event loop like the auth views used to,
+then through the PasswordHasher. Database round trips are simulated with a
+short sleep, since they are the same in both runs, so the numbers only show
+what bcrypt does to the latency of everything else.
+
+Run it with:
+
+    python -m benchmarks.login_storm [logins]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, List
+
+from fastapi import HTTPException
+
+from arithmetic.services.arithmetic_executor import ArithmeticExecutor
+from arithmetic.services.password_hasher import PasswordHasher, bcrypt_context
+from arithmetic.settings import settings
+
+LOGINS = 50
+OPERATION_INTERVAL = 0.005
+DB_ROUND_TRIP = 0.001
+PASSWORD = "Asdf!1234"  # noqa: S105
+
+
+async def _operation(arithmetic: ArithmeticExecutor, arrival: float) -> float:
+    await asyncio.sleep(DB_ROUND_TRIP)
+    await arithmetic.calculate("multiplication", 1234, 5678)
+    await asyncio.sleep(DB_ROUND_TRIP)
+    return time.perf_counter() - arrival
+
+
+async def _inline_verify(hashed: str) -> bool:
+    return bcrypt_context.verify(PASSWORD, hashed)
+
+
+async def _measure(
+    name: str,
+    logins: int,
+    verify: Callable[[str], Awaitable[bool]],
+) -> None:
+    hashed = bcrypt_context.hash(PASSWORD)
+    arithmetic = ArithmeticExecutor(None)
+    storm = asyncio.gather(
+        *(verify(hashed) for _ in range(logins)),
+        return_exceptions=True,
+    )
+    operations: List[asyncio.Task[float]] = []
+    start = arrival = time.perf_counter()
+    while True:
+        # Requests that should have arrived while the loop was blocked
+        # count from their arrival, not from when they got to run
+        while arrival <= time.perf_counter():
+            operations.append(asyncio.create_task(_operation(arithmetic, arrival)))
+            arrival += OPERATION_INTERVAL
+        if storm.done():
+            break
+        await asyncio.sleep(arrival - time.perf_counter())
+    elapsed = time.perf_counter() - start
+    logins = await storm
+    latencies = sorted(await asyncio.gather(*operations))
+    rejected = sum(isinstance(login, HTTPException) for login in logins)
+    print(  # noqa: T201
+        f"{name:>8}: storm {elapsed:>6.2f} s, {rejected:>3} logins rejected, "
+        f"{len(latencies):>5} operations, "
+        f"p50 {statistics.median(latencies) * 1000:>8.2f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:>8.2f} ms",
+    )
+
+
+async def main(logins: int) -> None:
+    """Runs the storm inline and through the password hasher."""
+    print(  # noqa: T201
+        f"{logins} logins with bcrypt cost {settings.bcrypt_rounds}, "
+        f"an operation every {OPERATION_INTERVAL * 1000:.0f} ms",
+    )
+    await _measure("inline", logins, _inline_verify)
+    with ThreadPoolExecutor(max_workers=settings.bcrypt_workers) as executor:
+        # Let every login of the storm wait, to compare like with like
+        hasher = PasswordHasher(executor, queue_timeout=3600)
+        await _measure("offload", logins, partial(hasher.verify, PASSWORD))
+        hasher = PasswordHasher(executor)
+        await _measure("shedding", logins, partial(hasher.verify, PASSWORD))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else LOGINS))
@@ -0,0 +1,105 @@
+"""
+Measures what the metrics and timing spans cost per request.
+
+The metrics are kept in the multiprocess mode, like under gunicorn, in a
+temporary directory. The costs measured are one observation of a
+histogram, the two SQLAlchemy events wrapped around every statement, a
+timing span inside and outside of a request, and each middleware around
+a request to an application that answers at once.
+
+Run it with:
+
+    python -m benchmarks.metrics_overhead
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Callable
+
+from starlette.types import Message, Receive, Scope, Send
+
+ITERATIONS = 100_000
+STATEMENT = (
+    "SELECT records.id, records.user_id FROM records "
+    "WHERE records.user_id = $1::INTEGER AND NOT records.deleted"
+)
+
+
+def _per_call(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+async def _app(scope: Scope, receive: Receive, send: Send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive() -> Message:
+    return {"type": "http.request"}
+
+
+async def _send(message: Message) -> None:
+    """Drops the response."""
+
+
+async def _per_request(app: Callable[[Scope, Receive, Send], object]) -> float:
+    scope: Scope = {"type": "http", "method": "GET", "path": "/"}
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await app(scope, _receive, _send)  # type: ignore[misc]
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def _report(name: str, seconds: float) -> None:
+    print(f"{name:>22}: {seconds * 1e6:>6.2f} us")  # noqa: T201
+
+
+async def main() -> None:
+    """Runs the benchmark in the multiprocess mode."""
+    with tempfile.TemporaryDirectory() as multiproc_dir:
+        # prometheus_client picks its storage when it is imported
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = multiproc_dir
+        from sqlalchemy.engine import Connection
+
+        from arithmetic.db.engine import _after_cursor_execute, _before_cursor_execute
+        from arithmetic.metrics import REQUEST_DURATION
+        from arithmetic.timing import Span, request_timings
+        from arithmetic.web.middleware import MetricsMiddleware, ServerTimingMiddleware
+
+        connection: Connection = SimpleNamespace(info={})  # type: ignore[assignment]
+
+        def span() -> None:
+            with Span("phase"):
+                pass
+
+        def statement() -> None:
+            _before_cursor_execute(connection, None, STATEMENT)
+            _after_cursor_execute(connection, None, STATEMENT)
+
+        histogram = REQUEST_DURATION.labels("GET", "/api/operation/", "200")
+        print(f"{ITERATIONS} calls each, multiprocess mode")  # noqa: T201
+        _report("histogram observation", _per_call(lambda: histogram.observe(0.01)))
+        _report("statement events", _per_call(statement))
+        _report("span, no request", _per_call(span))
+        reset_token = request_timings.set({})
+        _report("span", _per_call(span))
+        request_timings.reset(reset_token)
+        bare = await _per_request(_app)
+        _report(
+            "metrics middleware",
+            await _per_request(MetricsMiddleware(_app)) - bare,
+        )
+        _report(
+            "timing middleware",
+            await _per_request(ServerTimingMiddleware(_app)) - bare,
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
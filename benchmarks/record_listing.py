@@ -0,0 +1,151 @@
+"""
+Compares CPU time and memory per request of the record listing read paths.
+
+The ORM path is the one RecordService.get_records used to take: it loads
+RecordModel entities and builds every RecordDTO in Python, formatting the
+date with strftime. The projected path is RecordService.get_records, which
+reads plain rows with the date already formatted by the database.
+
+Everything happens in one transaction on the configured database, which is
+rolled back at the end, so nothing is left behind.
+
+Run it with:
+
+    python -m benchmarks.record_listing
+"""
+
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import insert, not_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from arithmetic.db.dao.record_dao import RecordDAO
+from arithmetic.db.dao.record_response import CountMode
+from arithmetic.db.dao.user_dao import UserDAO
+from arithmetic.db.meta import meta
+from arithmetic.db.models import load_all_models
+from arithmetic.db.models.operation_model import OperationModel
+from arithmetic.db.models.record_model import RecordModel
+from arithmetic.db.models.user_model import UserModel
+from arithmetic.services.record_cursor import encode_cursor
+from arithmetic.settings import settings
+from arithmetic.web.api.operation.schema import RecordDTO, RecordsDTO
+from arithmetic.web.api.operation.views import RecordService
+
+PAGE_SIZES = (10, 100, 1000)
+REQUESTS = 200
+
+
+async def _orm_page(session: AsyncSession, user_id: int, limit: int) -> RecordsDTO:
+    rows = await session.execute(
+        select(RecordModel)
+        .where(RecordModel.user_id == user_id)
+        .filter(not_(RecordModel.deleted))
+        .order_by(RecordModel.date.desc(), RecordModel.id.desc())
+        .limit(limit + 1),
+    )
+    records = list(rows.scalars().fetchall())
+    # The identity map would otherwise serve later requests from memory
+    session.expunge_all()
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(records[-1].date, records[-1].id)
+    return RecordsDTO(
+        records=[
+            RecordDTO(
+                id=record.id,
+                user_id=record.user_id,
+                amount=record.amount,
+                user_balance=record.user_balance,
+                operation_response=record.operation_response,
+                operation_text=record.operation_text,
+                date=record.date.strftime("%Y-%m-%d"),
+            )
+            for record in records
+        ],
+        total_count=None,
+        next_cursor=next_cursor,
+    )
+
+
+async def _projected_page(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+) -> RecordsDTO:
+    service = RecordService(RecordDAO(session), UserDAO(session), None)
+    return await service.get_records(user_id, limit, 0, count=CountMode.NONE)
+
+
+async def _measure(
+    name: str,
+    page: Callable[[AsyncSession, int, int], Awaitable[RecordsDTO]],
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+) -> None:
+    # Warm up statement caches
+    await page(session, user_id, limit)
+    start = time.process_time()
+    for _ in range(REQUESTS):
+        await page(session, user_id, limit)
+    cpu = (time.process_time() - start) / REQUESTS
+    tracemalloc.start()
+    await page(session, user_id, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(  # noqa: T201
+        f"{limit:>5} records, {name:>9}: {cpu * 1000:>7.3f} ms CPU, "
+        f"{peak / 1024:>8.1f} KiB peak",
+    )
+
+
+async def _fill(session: AsyncSession, rows: int) -> int:
+    operation = OperationModel(operation_type="benchmark", cost=1)
+    user = UserModel(username="record_listing_benchmark", password="")
+    session.add_all([operation, user])
+    await session.flush()
+    start = datetime(2024, 1, 1)
+    records: List[dict[str, object]] = [
+        {
+            "user_id": user.id,
+            "operation_id": operation.id,
+            "amount": 1,
+            "user_balance": rows - number,
+            "operation_response": str(number * 2),
+            "operation_text": f"{number}+{number}",
+            "date": start + timedelta(minutes=number),
+            "deleted": False,
+        }
+        for number in range(rows)
+    ]
+    await session.execute(insert(RecordModel), records)
+    return user.id
+
+
+async def main() -> None:
+    """Runs the benchmark for every page size."""
+    load_all_models()
+    engine = create_async_engine(str(settings.db_url))
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await connection.run_sync(meta.create_all)
+            session = async_sessionmaker(connection, expire_on_commit=False)()
+            user_id = await _fill(session, max(PAGE_SIZES))
+            print(f"{REQUESTS} requests per page size")  # noqa: T201
+            for limit in PAGE_SIZES:
+                await _measure("orm", _orm_page, session, user_id, limit)
+                await _measure("projected", _projected_page, session, user_id, limit)
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Compares the cost of encoding pages of records into a response body.
+
+The FastAPI path is what get_records used to do: validate the returned
+RecordsDTO again against the response model, turn it into plain python
+objects and encode those with UJSONResponse. The direct path dumps the
+RecordsDTO with pydantic-core, the way DTOSerializer does, with and without
+gzip. No database is needed, the pages are built in memory.
+
+Run it with:
+
+    python -m benchmarks.response_serialization
+"""
+
+import asyncio
+import gzip
+import time
+import tracemalloc
+from typing import Awaitable, Callable
+
+from fastapi.responses import UJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+
+from arithmetic.settings import settings
+from arithmetic.web.api.operation.schema import RecordDTO, RecordsDTO
+
+PAGE_SIZES = (10, 100, 1000)
+REQUESTS = 200
+
+records_field = create_response_field(name="Response_get_records", type_=RecordsDTO)
+records_adapter = TypeAdapter(RecordsDTO)
+
+
+def _page(size: int) -> RecordsDTO:
+    return RecordsDTO(
+        records=[
+            RecordDTO(
+                id=number,
+                user_id=1,
+                amount=1,
+                user_balance=size - number,
+                operation_response=str(number * 12345),
+                operation_text=f"{number}*12345",
+                date="2024-01-01",
+            )
+            for number in range(size)
+        ],
+        total_count=size,
+        next_cursor="MjAyNC0wMS0wMVQwMDowMDowMHwx",
+    )
+
+
+async def _fastapi(page: RecordsDTO) -> bytes:
+    content = await serialize_response(field=records_field, response_content=page)
+    return UJSONResponse(content).body
+
+
+async def _direct(page: RecordsDTO) -> bytes:
+    return records_adapter.dump_json(page)
+
+
+async def _direct_gzip(page: RecordsDTO) -> bytes:
+    return gzip.compress(
+        records_adapter.dump_json(page),
+        settings.response_gzip_level,
+        mtime=0,
+    )
+
+
+async def _measure(
+    name: str,
+    encode: Callable[[RecordsDTO], Awaitable[bytes]],
+    page: RecordsDTO,
+) -> None:
+    body = await encode(page)
+    start = time.process_time()
+    for _ in range(REQUESTS):
+        await encode(page)
+    cpu = (time.process_time() - start) / REQUESTS
+    tracemalloc.start()
+    await encode(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(  # noqa: T201
+        f"{len(page.records):>5} records, {name:>11}: "
+        f"{cpu * 1000:>7.3f} ms CPU, {peak / 1024:>7.1f} KiB peak, "
+        f"{len(body):>7} bytes",
+    )
+
+
+async def main() -> None:
+    """Runs the benchmark for every page size."""
+    print(f"{REQUESTS} responses per page size")  # noqa: T201
+    for size in PAGE_SIZES:
+        page = _page(size)
+        await _measure("fastapi", _fastapi, page)
+        await _measure("direct", _direct, page)
+        await _measure("direct gzip", _direct_gzip, page)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Measures record search latency with and without the trigram index.
+
+It fills a synthetic, unlogged copy of the records table in the configured
+database, runs the same query RecordDAO.search builds, then creates the
+pg_trgm index and runs it again. The table is dropped afterwards.
+
+Run it with:
+
+    python -m benchmarks.search [rows]
+"""
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    not_,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from arithmetic.settings import settings
+
+ROWS = 10_000_000
+USERS = 1_000
+TERMS = ("12+", "*77", "sqrt(9", "4242")
+REPEAT = 5
+
+meta = MetaData()
+records = Table(
+    "search_benchmark",
+    meta,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("operation_text", String(200)),
+    Column("deleted", Boolean, nullable=False),
+    Column("date", DateTime, nullable=False),
+    prefixes=["UNLOGGED"],
+)
+
+
+async def _fill(conn: AsyncConnection, rows: int) -> None:
+    await conn.run_sync(meta.drop_all)
+    await conn.run_sync(meta.create_all)
+    await conn.execute(
+        text(
+            "INSERT INTO search_benchmark (user_id, operation_text, deleted, date) "
+            "SELECT i % :users, "
+            "CASE i % 3 WHEN 0 THEN i || '+' || (i % 997) "
+            "WHEN 1 THEN (i % 991) || '*' || i "
+            "ELSE 'sqrt(' || i || ')' END, "
+            "i % 50 = 0, "
+            "now() - make_interval(secs => i) "
+            "FROM generate_series(1, :rows) AS i",
+        ),
+        {"users": USERS, "rows": rows},
+    )
+    await conn.execute(text("ANALYZE search_benchmark"))
+
+
+async def _measure(conn: AsyncConnection, term: str) -> float:
+    query = (
+        select(records)
+        .where(records.c.user_id == 42)
+        .where(records.c.operation_text.contains(term, autoescape=True))
+        .where(not_(records.c.deleted))
+        .order_by(records.c.date.desc(), records.c.id.desc())
+        .limit(10)
+    )
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        await conn.execute(query)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+async def main(rows: int) -> None:
+    """Runs the benchmark."""
+    engine = create_async_engine(str(settings.db_url), isolation_level="AUTOCOMMIT")
+    async with engine.connect() as conn:
+        print(f"filling {rows} rows")  # noqa: T201
+        await _fill(conn, rows)
+        try:
+            before = {term: await _measure(conn, term) for term in TERMS}
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(
+                text(
+                    "CREATE INDEX ON search_benchmark "
+                    "USING gin (operation_text gin_trgm_ops)",
+                ),
+            )
+            await conn.execute(text("ANALYZE search_benchmark"))
+            after = {term: await _measure(conn, term) for term in TERMS}
+        finally:
+            await conn.run_sync(meta.drop_all)
+    await engine.dispose()
+
+    for term in TERMS:
+        print(  # noqa: T201
+            f"{term!r:>10}: seq scan {before[term]:>9.2f} ms, "
+            f"trigram index {after[term]:>9.2f} ms",
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS))
@@ -0,0 +1,90 @@
+"""
+Compares lock acquire throughput of the user lock implementations.
+
+Run it with:
+
+    python -m benchmarks.user_lock
+"""
+
+import asyncio
+import time
+from functools import partial
+from typing import Awaitable, Callable, Dict
+
+from arithmetic.services.user_level_lock import InProcessUserLock
+
+COROUTINES = 10_000
+ROUNDS = 5
+# Every FAILURE_RATE-th operation raises, like a failing perform_operation.
+FAILURE_RATE = 100
+
+
+class LegacyUserLock:
+    """The dict of asyncio locks guarded by a global lock used before sharding."""
+
+    def __init__(self) -> None:
+        self.locks: Dict[int, asyncio.Lock] = {}
+        self.global_lock = asyncio.Lock()
+
+    async def acquire(self, user_id: int) -> asyncio.Lock:
+        """Acquires the lock."""
+        async with self.global_lock:
+            if user_id not in self.locks:
+                self.locks[user_id] = asyncio.Lock()
+        return self.locks[user_id]
+
+    async def release(self, user_id: int) -> None:
+        """Releases the lock."""
+        async with self.global_lock:
+            if user_id in self.locks and not self.locks[user_id].locked():
+                del self.locks[user_id]
+
+
+async def _work(index: int) -> None:
+    await asyncio.sleep(0)
+    if index % FAILURE_RATE == 0:
+        raise ValueError(index)
+
+
+async def _legacy(user_lock: LegacyUserLock, index: int, user_id: int) -> None:
+    lock = await user_lock.acquire(user_id)
+    async with lock:
+        await _work(index)
+    await user_lock.release(user_id)
+
+
+async def _sharded(user_lock: InProcessUserLock, index: int, user_id: int) -> None:
+    async with user_lock.hold(user_id):
+        await _work(index)
+
+
+async def _measure(
+    operation: Callable[[int, int], Awaitable[None]],
+    users: int,
+) -> float:
+    start = time.perf_counter()
+    for round_ in range(ROUNDS):
+        await asyncio.gather(
+            *(operation(i, round_ * COROUTINES + i % users) for i in range(COROUTINES)),
+            return_exceptions=True,
+        )
+    return COROUTINES * ROUNDS / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    """Runs the benchmark for a few user distributions."""
+    print(f"{COROUTINES} concurrent coroutines, {ROUNDS} rounds")  # noqa: T201
+    for users in (1, 100, COROUTINES):
+        legacy = LegacyUserLock()
+        sharded = InProcessUserLock()
+        legacy_rate = await _measure(partial(_legacy, legacy), users)
+        sharded_rate = await _measure(partial(_sharded, sharded), users)
+        print(  # noqa: T201
+            f"{users:>6} users: legacy {legacy_rate:>10.0f} acq/s, "
+            f"sharded {sharded_rate:>10.0f} acq/s, "
+            f"leftover entries {len(legacy.locks)} / {len(sharded)}",
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
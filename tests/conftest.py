@@ -1,22 +1,35 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import timedelta
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, Generator
 
 import pytest
 from fastapi import FastAPI
-from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import (
-    AsyncEngine,
-    AsyncSession,
-    async_sessionmaker,
-    create_async_engine,
-)
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
+from arithmetic.db.dao.operation_catalog import operation_catalog
 from arithmetic.db.dao.user_dao import UserDAO
-from arithmetic.db.dependencies import get_db_session
+from arithmetic.db.dependencies import (
+    get_db_pool,
+    get_db_read_session,
+    get_db_session,
+    get_db_session_factory,
+)
+from arithmetic.db.engine import create_engine
 from arithmetic.db.utils import create_database, drop_database
+from arithmetic.services.arithmetic_executor import ArithmeticExecutor
+from arithmetic.services.password_hasher import PasswordHasher
+from arithmetic.services.random_service import (
+    LocalRandomStrings,
+    RandomStringBuffer,
+    ResilientRandomStrings,
+)
+from arithmetic.services.security_service import token_cache
 from arithmetic.services.security_utils import create_access_token
-from arithmetic.settings import settings
+from arithmetic.services.user_level_lock import InProcessUserLock
 from arithmetic.web.application import get_app
+from tests.utils import RandomOrgStub
 
 
 @pytest.fixture(scope="session")
@@ -43,7 +56,7 @@ async def _engine() -> AsyncGenerator[AsyncEngine, None]:
 
     await create_database()
 
-    engine = create_async_engine(str(settings.db_url))
+    engine = create_engine()
     async with engine.begin() as conn:
         await conn.run_sync(meta.create_all)
 
@@ -82,11 +95,47 @@ async def dbsession(
         await session.close()
         await trans.rollback()
         await connection.close()
+        # Process-wide caches still hold rows of the rolled back transaction
+        operation_catalog.invalidate()
+        token_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def arithmetic_pool() -> Generator[ProcessPoolExecutor, None, None]:
+    """
+    Process pool for arithmetic on large operands.
+
+    Workers are only spawned by the tests that offload something.
+
+    :yield: process pool.
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        yield pool
+    finally:
+        pool.shutdown()
+
+
+@pytest.fixture(scope="session")
+def password_executor() -> Generator[ThreadPoolExecutor, None, None]:
+    """
+    Thread pool for bcrypt.
+
+    :yield: thread pool.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        yield executor
 
 
 @pytest.fixture
 def fastapi_app(
     dbsession: AsyncSession,
+    random_strings: RandomStringBuffer,
+    arithmetic_pool: ProcessPoolExecutor,
+    password_executor: ThreadPoolExecutor,
 ) -> FastAPI:
     """
     Fixture for creating FastAPI app.
@@ -95,6 +144,18 @@ def fastapi_app(
     """
     application = get_app()
     application.dependency_overrides[get_db_session] = lambda: dbsession
+    application.dependency_overrides[get_db_read_session] = lambda: dbsession
+    application.dependency_overrides[get_db_session_factory] = lambda: (
+        async_sessionmaker(dbsession.bind, expire_on_commit=False)
+    )
+    application.dependency_overrides[get_db_pool] = lambda: dbsession.bind.engine.pool
+    application.state.user_lock = InProcessUserLock()
+    application.state.random_strings = ResilientRandomStrings(
+        random_strings,
+        fallback=LocalRandomStrings(),
+    )
+    application.state.arithmetic_executor = ArithmeticExecutor(arithmetic_pool)
+    application.state.password_hasher = PasswordHasher(password_executor)
     return application
 
 
@@ -109,9 +170,32 @@ async def with_user_id(dbsession: AsyncSession) -> int | None:
 
 
 @pytest.fixture
-async def mock_generate_random_string() -> str:
-    """Returns a mock random string."""
-    "r_an_d_o_m_5tring"
+def random_org_stub() -> RandomOrgStub:
+    """Local random.org JSON-RPC server."""
+    return RandomOrgStub()
+
+
+@pytest.fixture
+async def random_strings(
+    random_org_stub: RandomOrgStub,
+) -> AsyncGenerator[RandomStringBuffer, None]:
+    """
+    Random string buffer that talks to the local random.org stub.
+
+    :param random_org_stub: local random.org server.
+    :yield: random string buffer.
+    """
+    async with AsyncClient(transport=ASGITransport(app=random_org_stub)) as client:
+        buffer = RandomStringBuffer(
+            client,
+            batch_size=10,
+            low_watermark=2,
+            high_watermark=20,
+        )
+        try:
+            yield buffer
+        finally:
+            await buffer.stop()
 
 
 @pytest.fixture
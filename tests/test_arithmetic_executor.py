@@ -0,0 +1,106 @@
+import random
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+import pytest
+from fastapi import HTTPException
+from starlette import status
+
+from arithmetic.services.arithmetic_executor import ArithmeticExecutor
+from arithmetic.services.expression import compile_expression
+from arithmetic.services.number_format import int_to_str
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Thread pool that counts the computations it receives."""
+
+    def __init__(self) -> None:
+        super().__init__(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        """Counts and submits a computation."""
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_int_to_str() -> None:
+    """Test converting integers past the interpreter digit limit."""
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        for bits in (1, 100, 2999, 3000, 3001, 20000, 100000):
+            value = random.getrandbits(bits)
+            assert int_to_str(value) == str(value)
+            assert int_to_str(-value) == str(-value)
+            assert int_to_str(10**bits) == str(10**bits)
+            assert int_to_str(10**bits - 1) == str(10**bits - 1)
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+
+@pytest.mark.anyio
+async def test_small_operations_run_inline() -> None:
+    """Test that only operations with a large result are offloaded."""
+    with CountingExecutor() as pool:
+        executor = ArithmeticExecutor(pool, inline_max_bits=1000)
+
+        assert await executor.calculate("multiplication", 3, 2) == "6"
+        assert pool.submitted == 0
+
+        big = 10**400
+        assert await executor.calculate("multiplication", big, big) == "1" + "0" * 800
+        assert pool.submitted == 1
+
+
+@pytest.mark.anyio
+async def test_additions_are_sized_by_their_largest_term() -> None:
+    """Test that additions of terms whose bits add up past the limit run inline."""
+    with CountingExecutor() as pool:
+        executor = ArithmeticExecutor(pool, inline_max_bits=1000)
+        term = 2**700
+
+        assert await executor.calculate("addition", term, term) == str(2**701)
+        assert await executor.calculate("subtraction", term, term) == "0"
+        assert pool.submitted == 0
+
+        await executor.calculate("multiplication", term, term)
+        assert pool.submitted == 1
+
+
+@pytest.mark.anyio
+async def test_expressions_are_offloaded_by_size() -> None:
+    """Test that expressions are offloaded when their leaves are large."""
+    compiled = compile_expression("a * a * a")
+    with CountingExecutor() as pool:
+        executor = ArithmeticExecutor(pool, inline_max_bits=1000)
+
+        assert await executor.evaluate(compiled, {"a": 10}) == "1000"
+        assert pool.submitted == 0
+
+        assert await executor.evaluate(compiled, {"a": 10**200}) == "1" + "0" * 600
+        assert pool.submitted == 1
+
+
+@pytest.mark.anyio
+async def test_unrepresentable_result() -> None:
+    """Test that results that don't fit in a float are rejected."""
+    executor = ArithmeticExecutor(None)
+
+    with pytest.raises(HTTPException) as error:
+        await executor.calculate("division", 10**400, 3)
+    assert error.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.anyio
+async def test_deadline() -> None:
+    """Test that an offloaded computation that takes too long is abandoned."""
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        executor = ArithmeticExecutor(pool, inline_max_bits=0, timeout=0.05)
+
+        with pytest.raises(HTTPException) as error:
+            await executor.run(1, partial(time.sleep, 0.2))  # type: ignore[arg-type]
+    assert error.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
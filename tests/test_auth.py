@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+from passlib.context import CryptContext
+from starlette import status
+
+from arithmetic.services.password_hasher import PasswordHasher
+
+
+@pytest.mark.anyio
+async def test_create_user_and_login(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+) -> None:
+    """Test that a new user can log in with its password only."""
+    user = {"username": "newUser", "password": "Asdf!1234"}
+
+    response = await client.post(fastapi_app.url_path_for("create_user"), json=user)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    url = fastapi_app.url_path_for("login_for_access_token")
+    response = await client.post(url, json=user)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["access_token"]
+
+    response = await client.post(url, json={**user, "password": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.anyio
+async def test_saturated_password_hasher() -> None:
+    """Test that calls that can't get a slot in time are rejected."""
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=10)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        hasher = PasswordHasher(
+            executor,
+            max_pending=1,
+            queue_timeout=0.01,
+            context=context,
+        )
+
+        first, second = await asyncio.gather(
+            hasher.hash("Asdf!1234"),
+            hasher.hash("Asdf!1234"),
+            return_exceptions=True,
+        )
+
+        assert isinstance(first, str)
+        assert await hasher.verify("Asdf!1234", first)
+    assert isinstance(second, HTTPException)
+    assert second.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
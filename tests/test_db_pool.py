@@ -0,0 +1,70 @@
+from typing import AsyncGenerator
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette import status
+
+from arithmetic.db.engine import InstrumentedPool, create_engine, prewarm_pool
+
+
+@pytest.fixture
+async def small_engine(_engine: AsyncEngine) -> AsyncGenerator[AsyncEngine, None]:
+    """
+    Engine with a pool of two connections and no overflow.
+
+    :yield: engine.
+    """
+    engine = create_engine(pool_size=2, max_overflow=0, pool_timeout=0.05)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_prewarm_pool(small_engine: AsyncEngine) -> None:
+    """Tests that pre-warming opens the connections and returns them to the pool."""
+    pool = small_engine.pool
+    assert isinstance(pool, InstrumentedPool)
+
+    await prewarm_pool(small_engine, 2)
+
+    assert pool.checkedin() == 2
+    assert pool.checkedout() == 0
+    assert pool.checkouts == 2
+
+
+@pytest.mark.anyio
+async def test_pool_timeouts(small_engine: AsyncEngine) -> None:
+    """Tests that checkouts given up after the pool timeout are counted."""
+    pool = small_engine.pool
+    assert isinstance(pool, InstrumentedPool)
+
+    async with small_engine.connect(), small_engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            await small_engine.connect()
+        assert pool.checkedout() == 2
+
+    assert pool.timeouts == 1
+    assert pool.waiting == 0
+    assert pool.checkouts == 2
+    assert pool.max_wait_time >= 0.05
+
+
+@pytest.mark.anyio
+async def test_db_pool_status(fastapi_app: FastAPI, client: AsyncClient) -> None:
+    """Tests that the pool statistics are exposed by the monitoring router."""
+    url = fastapi_app.url_path_for("db_pool_status")
+    response = await client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    pool = response.json()
+    assert pool["size"] == 5
+    assert pool["max_overflow"] == 10
+    # The connection of the test session
+    assert pool["checked_out"] == 1
+    assert pool["waiting"] == 0
+    assert pool["timeouts"] == 0
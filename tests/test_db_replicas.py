@@ -0,0 +1,213 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import AsyncGenerator, List, Optional
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette import status
+
+from arithmetic.db.dependencies import get_db_read_session
+from arithmetic.db.engine import create_engine
+from arithmetic.db.replicas import Replica, ReplicaRouter
+from arithmetic.settings import settings
+
+
+@pytest.fixture
+async def replica_engines(
+    _engine: AsyncEngine,
+) -> AsyncGenerator[List[AsyncEngine], None]:
+    """
+    Two replica engines, both pointing at the test database.
+
+    :yield: replica engines.
+    """
+    engines = [create_engine(pool_size=1) for _ in range(2)]
+    try:
+        yield engines
+    finally:
+        for engine in engines:
+            await engine.dispose()
+
+
+async def _read_from(router: ReplicaRouter) -> Optional[Replica]:
+    """Open the next read session and tell which replica it is on."""
+    session = await router.read_session()
+    if session is None:
+        return None
+    try:
+        return next(
+            replica for replica in router.replicas if replica.engine is session.bind
+        )
+    finally:
+        await session.close()
+
+
+@pytest.mark.anyio
+async def test_replicas_round_robin(
+    replica_engines: List[AsyncEngine],
+) -> None:
+    """Tests that reads go to the fresh replicas in turn."""
+    router = ReplicaRouter(replica_engines)
+    await router.check()
+    first, second = router.replicas
+
+    picked = [await _read_from(router) for _ in range(4)]
+
+    assert first.lag == second.lag == 0
+    assert picked == [first, second] * 2
+    assert first.reads == second.reads == 2
+    assert router.primary_reads == 0
+
+
+@pytest.mark.anyio
+async def test_stale_replica_skipped(
+    replica_engines: List[AsyncEngine],
+) -> None:
+    """Tests that replicas too far behind are skipped, down to the primary."""
+    router = ReplicaRouter(replica_engines, max_lag=5)
+    await router.check()
+    first, second = router.replicas
+    first.lag = 10
+
+    assert await _read_from(router) is second
+    second.lag = 10
+    assert await _read_from(router) is None
+    assert router.primary_reads == 1
+
+
+@pytest.mark.anyio
+async def test_unreachable_replica_skipped(
+    replica_engines: List[AsyncEngine],
+) -> None:
+    """Tests that a replica whose lag can't be measured gets no reads."""
+    unreachable = create_engine(
+        str(settings.db_url.with_port(1)),
+        pool_timeout=0.1,
+    )
+    router = ReplicaRouter([unreachable, replica_engines[0]])
+    await router.check()
+    down, up = router.replicas
+
+    assert down.lag is None
+    assert [await _read_from(router) for _ in range(3)] == [up] * 3
+    await router.stop()
+
+
+@pytest.fixture
+async def silent_replica() -> AsyncGenerator[AsyncEngine, None]:
+    """
+    Engine of a replica that accepts connections but never answers.
+
+    :yield: replica engine.
+    """
+
+    async def never_answer(
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(never_answer, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    engine = create_engine(str(settings.db_url.with_host("127.0.0.1").with_port(port)))
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+        server.close()
+
+
+@pytest.mark.anyio
+async def test_silent_replica_check_is_bounded(silent_replica: AsyncEngine) -> None:
+    """Tests that a replica that never answers the connection is given up on."""
+    router = ReplicaRouter([silent_replica], check_interval=0.2)
+    router.replicas[0].lag = 0
+    start = time.monotonic()
+    await router.check()
+
+    assert time.monotonic() - start < 1
+    assert router.replicas[0].lag is None
+
+
+@pytest.mark.anyio
+async def test_silent_replica_read_is_bounded(silent_replica: AsyncEngine) -> None:
+    """Tests that a read doesn't wait on a replica that stopped answering."""
+    router = ReplicaRouter([silent_replica], check_interval=0.2)
+    replica = router.replicas[0]
+    replica.lag = 0
+    replica.measured_at = time.monotonic()
+    start = time.monotonic()
+
+    assert await router.read_session() is None
+    assert time.monotonic() - start < 1
+    assert replica.lag is None
+    assert router.primary_reads == 1
+
+
+@pytest.mark.anyio
+async def test_outdated_lag_is_unknown(
+    replica_engines: List[AsyncEngine],
+) -> None:
+    """Tests that a lag not measured for a few intervals isn't trusted."""
+    router = ReplicaRouter(replica_engines[:1], check_interval=1)
+    await router.check()
+    replica = router.replicas[0]
+    assert await _read_from(router) is replica
+
+    replica.measured_at -= 10
+    assert await _read_from(router) is None
+    assert replica.lag is None
+
+
+@pytest.mark.anyio
+async def test_unreachable_replica_reads_from_primary() -> None:
+    """Tests that a replica failing between two checks falls back to the primary."""
+    unreachable = create_engine(str(settings.db_url.with_port(1)))
+    router = ReplicaRouter([unreachable])
+    down = router.replicas[0]
+    down.lag = 0
+    down.measured_at = time.monotonic()
+
+    assert await router.read_session() is None
+    await router.stop()
+
+    assert down.lag is None
+    assert down.reads == 0
+    assert router.primary_reads == 1
+
+
+@pytest.mark.anyio
+async def test_primary_reads_share_the_request_session(
+    dbsession: AsyncSession,
+) -> None:
+    """Tests that without replicas reads use the session of the request."""
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+    sessions = get_db_read_session(request, dbsession)  # type: ignore[arg-type]
+
+    assert await sessions.__anext__() is dbsession
+    with pytest.raises(StopAsyncIteration):
+        await sessions.__anext__()
+
+
+@pytest.mark.anyio
+async def test_records_read_from_replica(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    replica_engines: List[AsyncEngine],
+) -> None:
+    """Tests that listings use the read session of the replica router."""
+    router = ReplicaRouter(replica_engines)
+    await router.check()
+    fastapi_app.state.db_replica_router = router
+    del fastapi_app.dependency_overrides[get_db_read_session]
+
+    url = fastapi_app.url_path_for("search_records", term="1")
+    for _ in range(2):
+        response = await authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+
+    assert [replica.reads for replica in router.replicas] == [1, 1]
@@ -0,0 +1,97 @@
+import pytest
+
+from arithmetic.services.expression import (
+    ExpressionError,
+    compile_expression,
+    normalize,
+)
+from arithmetic.web.api.operation.schema import OperationBase, OperationEnum
+
+
+@pytest.mark.parametrize(
+    ("expression", "variables", "result"),
+    [
+        ("1 + 2 * 3", {}, "7"),
+        ("(1 + 2) * 3", {}, "9"),
+        ("10 - 4 - 3", {}, "3"),
+        ("-(2 + 3) / 2", {}, "-2.5"),
+        ("(a + b) * sqrt(c)", {"a": 1, "b": 2, "c": 16}, "12.0"),
+        ("X * Sqrt(x) + X", {"X": 2, "x": 9}, "8.0"),
+    ],
+)
+def test_evaluate(expression: str, variables: dict, result: str) -> None:
+    """Test evaluating expressions with the usual precedence."""
+    assert compile_expression(expression).evaluate(variables) == result
+
+
+def test_compiled_expressions_are_cached() -> None:
+    """Test that equivalent spellings reuse the same compiled tree."""
+    assert normalize(" ( A+b ) *  SQRT( c ) ") == "(A+b)*sqrt(c)"
+    assert normalize("1  2") == "1 2"
+    assert compile_expression("(a + b) * sqrt(c)") is compile_expression(
+        "(a+b)*SQRT(c)",
+    )
+
+
+def test_operations_of_expression() -> None:
+    """Test that the nodes of each operation type are counted for billing."""
+    compiled = compile_expression("(a + b) * sqrt(c) + 2 / a")
+
+    assert compiled.operations == {
+        "addition": 2,
+        "multiplication": 1,
+        "division": 1,
+        "squareRoot": 1,
+    }
+    assert compiled.variables == {"a", "b", "c"}
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "1 +",
+        "(1 + 2",
+        "1 2",
+        "2 ** 3",
+        "2.5",
+        "__import__('os')",
+        "open(a)",
+        "(" * 30 + "1" + ")" * 30,
+        "+".join(["1"] * 40),
+    ],
+)
+def test_invalid_expression(expression: str) -> None:
+    """Test that malformed or oversized expressions are rejected."""
+    with pytest.raises(ExpressionError):
+        compile_expression(expression)
+
+
+@pytest.mark.parametrize(
+    ("expression", "variables"),
+    [("1 / (a - a)", {"a": 1}), ("sqrt(0 - 4)", {}), ("a + b", {"a": 1})],
+)
+def test_undefined_result(expression: str, variables: dict) -> None:
+    """Test that undefined results and missing variables are errors."""
+    with pytest.raises(ExpressionError):
+        compile_expression(expression).evaluate(variables)
+
+
+def test_result_bits() -> None:
+    """Test that the bound of the result size holds."""
+    compiled = compile_expression("(a + b) * a - 3")
+    variables = {"a": 10**300, "b": -(10**200)}
+
+    result = int(compiled.evaluate(variables))
+    assert result.bit_length() <= compiled.result_bits(variables)
+
+
+def test_mixed_case_variables_are_accepted() -> None:
+    """Test that variable names keep their case when an operation is validated."""
+    operation = OperationBase(
+        type=OperationEnum.EXPRESSION,
+        expression="X+1",
+        variables={"X": 1},
+    )
+
+    assert operation.variables == {"X": 1}
+    assert compile_expression("X+1").evaluate(operation.variables) == "2"
@@ -0,0 +1,140 @@
+import asyncio
+from typing import AsyncGenerator, List
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette import status
+
+from arithmetic.db.dao.operation_dao import OperationDAO
+from arithmetic.db.dao.record_dao import RecordDAO
+from arithmetic.db.dao.user_dao import UserDAO
+from arithmetic.db.models.record_model import RecordModel
+from arithmetic.services.group_commit import GroupCommitter
+from arithmetic.services.record_service import RecordService
+from arithmetic.web.api.operation.schema import OperationBase, OperationEnum
+from tests.utils import RandomOrgStub
+
+
+@pytest.fixture
+async def group_committer(
+    dbsession: AsyncSession,
+) -> AsyncGenerator[GroupCommitter, None]:
+    """
+    Group committer that writes through the test connection.
+
+    :yield: started group committer.
+    """
+    committer = GroupCommitter(
+        async_sessionmaker(dbsession.bind, expire_on_commit=False),
+        max_batch=10,
+        max_delay=0.05,
+    )
+    committer.start()
+    try:
+        yield committer
+    finally:
+        await committer.stop()
+
+
+@pytest.fixture
+async def user_ids(dbsession: AsyncSession) -> List[int]:
+    """Create three users with the default balance."""
+    user_dao = UserDAO(dbsession)
+    for number in range(3):
+        await user_dao.create_user(f"user{number}", "Asdf!1234")
+    await dbsession.flush()
+    return [(await user_dao.get_user(f"user{number}")).id for number in range(3)]
+
+
+@pytest.mark.anyio
+async def test_concurrent_writes_share_a_commit(
+    dbsession: AsyncSession,
+    group_committer: GroupCommitter,
+    user_ids: List[int],
+) -> None:
+    """Test that concurrent debits are committed together, each on its own."""
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    operation = await operation_dao.get_operation(OperationEnum.ADDITION.value)
+    service = RecordService(
+        RecordDAO(dbsession),
+        UserDAO(dbsession),
+        group_committer,
+    )
+    amounts = [30, 200, 40]
+
+    results = await asyncio.gather(
+        *(
+            service.create_records(
+                user_id,
+                [
+                    RecordModel(
+                        operation_id=operation.id,
+                        amount=amount,
+                        operation_text="1+2",
+                        operation_response="3",
+                    ),
+                ],
+            )
+            for user_id, amount in zip(user_ids, amounts)
+        ),
+        return_exceptions=True,
+    )
+
+    assert results[0] == 70
+    assert isinstance(results[1], HTTPException)
+    assert results[1].status_code == status.HTTP_402_PAYMENT_REQUIRED
+    assert results[2] == 60
+    assert group_committer.commits == 1
+
+    dbsession.expire_all()
+    user_dao = UserDAO(dbsession)
+    balances = [
+        (await user_dao.get_user_by_id(user_id)).balance for user_id in user_ids
+    ]
+    assert balances == [70, 100, 60]
+
+
+@pytest.mark.anyio
+async def test_operation_with_group_commit(
+    fastapi_app: FastAPI,
+    with_user_id: int,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+    group_committer: GroupCommitter,
+) -> None:
+    """Test that operations are recorded through the group committer."""
+    fastapi_app.state.group_committer = group_committer
+    url = fastapi_app.url_path_for("new_operation")
+    operation = OperationBase(type=OperationEnum.ADDITION, first_term=1, second_term=2)
+    await OperationDAO(dbsession).add_new_operation(OperationEnum.ADDITION.value, 1)
+
+    response = await authenticated_client.post(url, json=operation.model_dump())
+    assert response.status_code == status.HTTP_201_CREATED
+    assert group_committer.commits == 1
+
+    records = await RecordDAO(dbsession).get_all_records(with_user_id, 10, 0)
+    assert [record.operation_text for record in records.records] == ["1+2"]
+
+
+@pytest.mark.anyio
+async def test_unaffordable_operation_with_group_commit(
+    fastapi_app: FastAPI,
+    with_user_id: int,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+    group_committer: GroupCommitter,
+    random_org_stub: RandomOrgStub,
+) -> None:
+    """Test that the balance is checked before computing with group commit."""
+    fastapi_app.state.group_committer = group_committer
+    url = fastapi_app.url_path_for("new_operation")
+    operation = OperationBase(type=OperationEnum.RANDOM)
+    await OperationDAO(dbsession).add_new_operation(OperationEnum.RANDOM.value, 101)
+
+    response = await authenticated_client.post(url, json=operation.model_dump())
+    assert response.status_code == status.HTTP_402_PAYMENT_REQUIRED
+    assert random_org_stub.calls == []
+    assert group_committer.commits == 0
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from typing import AsyncGenerator
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+from arithmetic.services.loop_monitor import LoopLagMonitor
+
+
+def _block_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.fixture
+async def loop_monitor() -> AsyncGenerator[LoopLagMonitor, None]:
+    """
+    Loop monitor with a short interval and threshold.
+
+    :yield: started loop monitor.
+    """
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05, samples=100)
+    monitor.start()
+    try:
+        yield monitor
+    finally:
+        await monitor.stop()
+
+
+@pytest.mark.anyio
+async def test_stall_stack_captured(loop_monitor: LoopLagMonitor) -> None:
+    """Tests that the stack of a blocking callback is caught while it blocks."""
+    await asyncio.sleep(0.05)
+    _block_loop(0.3)
+    await asyncio.sleep(0.05)
+
+    assert loop_monitor.blocked == 1
+    stall = loop_monitor.stalls[0]
+    assert "in _block_loop" in stall.stack
+    assert "test_stall_stack_captured" in stall.stack
+    assert stall.lag is not None
+    assert stall.lag >= 0.2
+    assert loop_monitor.percentiles()["max"] >= 0.2
+
+
+@pytest.mark.anyio
+async def test_lag_percentiles(loop_monitor: LoopLagMonitor) -> None:
+    """Tests that an idle loop has no stall and a small lag."""
+    await asyncio.sleep(0.2)
+
+    percentiles = loop_monitor.percentiles()
+    assert len(loop_monitor.lags) > 5
+    assert loop_monitor.blocked == 0
+    assert 0 <= percentiles["p50"] <= percentiles["p99"] <= percentiles["max"] < 0.05
+
+
+@pytest.mark.anyio
+async def test_loop_lag_status(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    loop_monitor: LoopLagMonitor,
+) -> None:
+    """Tests that the lag and the stalls are exposed by the monitoring router."""
+    url = fastapi_app.url_path_for("loop_lag_status")
+    disabled = await client.get(url)
+    fastapi_app.state.loop_monitor = loop_monitor
+    await asyncio.sleep(0.05)
+    _block_loop(0.15)
+    await asyncio.sleep(0.03)
+
+    response = await client.get(url)
+
+    assert disabled.status_code == status.HTTP_404_NOT_FOUND
+    assert response.status_code == status.HTTP_200_OK
+    lag = response.json()
+    assert lag["interval"] == 0.01
+    assert lag["samples"] > 0
+    assert lag["blocked"] == 1
+    assert lag["max"] >= 0.1
+    assert "in _block_loop" in lag["stalls"][0]["stack"]
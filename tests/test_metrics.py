@@ -0,0 +1,130 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+from starlette import status
+
+from arithmetic.metrics import generate_metrics
+from arithmetic.services.random_service import generate_random_strings
+from arithmetic.services.user_level_lock import InProcessUserLock
+from tests.utils import RandomOrgStub
+
+
+def _sample(name: str, **labels: str) -> float:
+    value: Optional[float] = REGISTRY.get_sample_value(name, labels)
+    return value or 0.0
+
+
+# Run by each worker process, which imports prometheus_client
+# with the multiprocess directory set
+OBSERVE_IN_WORKER = (
+    "from arithmetic.metrics import REQUEST_DURATION; "
+    "REQUEST_DURATION.labels('GET', '/api/health', '200').observe(0.01)"
+)
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+) -> None:
+    """Tests that requests, statements and token lookups are measured."""
+    request_labels: Dict[str, str] = {
+        "method": "GET",
+        "route": "/api/operation/",
+        "status": "200",
+    }
+    requests = _sample("arithmetic_request_duration_seconds_count", **request_labels)
+    selects = _sample(
+        "arithmetic_db_query_duration_seconds_count",
+        statement="SELECT",
+        table="records",
+    )
+    lookups = _sample("arithmetic_token_cache_requests_total", result="miss")
+
+    response = await authenticated_client.get(fastapi_app.url_path_for("get_records"))
+    assert response.status_code == status.HTTP_200_OK
+    metrics = await authenticated_client.get(fastapi_app.url_path_for("metrics"))
+
+    assert metrics.status_code == status.HTTP_200_OK
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert "arithmetic_request_duration_seconds_bucket" in metrics.text
+    assert (
+        _sample("arithmetic_request_duration_seconds_count", **request_labels)
+        == requests + 1
+    )
+    assert (
+        _sample(
+            "arithmetic_db_query_duration_seconds_count",
+            statement="SELECT",
+            table="records",
+        )
+        > selects
+    )
+    assert _sample("arithmetic_token_cache_requests_total", result="miss") > lookups
+
+
+@pytest.mark.anyio
+async def test_unmatched_route_label(fastapi_app: FastAPI, client: AsyncClient) -> None:
+    """Tests that unknown paths share one label instead of one per path."""
+    labels = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = _sample("arithmetic_request_duration_seconds_count", **labels)
+
+    for path in ("/api/nope/1", "/api/nope/2"):
+        assert (await client.get(path)).status_code == status.HTTP_404_NOT_FOUND
+
+    assert _sample("arithmetic_request_duration_seconds_count", **labels) == before + 2
+
+
+@pytest.mark.anyio
+async def test_user_lock_wait_measured() -> None:
+    """Tests that every acquisition of the user lock is measured."""
+    before = _sample("arithmetic_user_lock_wait_seconds_count", backend="memory")
+
+    async with InProcessUserLock().hold(1):
+        pass
+
+    assert _sample("arithmetic_user_lock_wait_seconds_count", backend="memory") == (
+        before + 1
+    )
+
+
+@pytest.mark.anyio
+async def test_random_org_latency_measured(random_org_stub: RandomOrgStub) -> None:
+    """Tests that random.org calls are measured by outcome."""
+    name = "arithmetic_random_org_request_duration_seconds_count"
+    ok, error = _sample(name, outcome="ok"), _sample(name, outcome="error")
+
+    async with AsyncClient(transport=ASGITransport(app=random_org_stub)) as client:
+        await generate_random_strings(client, 1)
+        random_org_stub.error = True
+        with pytest.raises(Exception, match="down"):
+            await generate_random_strings(client, 1)
+
+    assert _sample(name, outcome="ok") == ok + 1
+    assert _sample(name, outcome="error") == error + 1
+
+
+def test_metrics_aggregate_across_processes(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that the observations of every worker are added up."""
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    workers = [
+        subprocess.Popen([sys.executable, "-c", OBSERVE_IN_WORKER])  # noqa: S603
+        for _ in range(2)
+    ]
+    assert [worker.wait(timeout=30) for worker in workers] == [0, 0]
+
+    text = generate_metrics().decode()
+
+    assert (
+        'arithmetic_request_duration_seconds_count{method="GET",'
+        'route="/api/health",status="200"} 2.0'
+    ) in text
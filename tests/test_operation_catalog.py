@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from arithmetic.db.dao.operation_catalog import operation_catalog
+from arithmetic.db.dao.operation_dao import OperationDAO
+from arithmetic.web.api.operation.schema import OperationEnum
+
+
+@pytest.mark.anyio
+async def test_get_operation_is_served_from_catalog(dbsession: AsyncSession) -> None:
+    """Tests that repeated lookups don't query the operations table."""
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 3)
+    first = await operation_dao.get_operation(OperationEnum.ADDITION.value)
+
+    statements = []
+
+    def count_statements(*args: object) -> None:
+        statements.append(args)
+
+    sync_engine = dbsession.bind.sync_engine  # type: ignore[union-attr]
+    event.listen(sync_engine, "before_cursor_execute", count_statements)
+    try:
+        second = await operation_dao.get_operation(OperationEnum.ADDITION.value)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", count_statements)
+
+    assert statements == []
+    assert second.id == first.id
+    assert second.cost == 3
+
+
+@pytest.mark.anyio
+async def test_add_new_operation_invalidates_catalog(dbsession: AsyncSession) -> None:
+    """Tests that committing a new operation drops the cached catalog."""
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    await operation_dao.get_operation(OperationEnum.ADDITION.value)
+    assert operation_catalog.is_fresh()
+
+    await operation_dao.add_new_operation(OperationEnum.SQUARE.value, 5)
+    assert operation_catalog.is_fresh()
+    await dbsession.commit()
+    assert not operation_catalog.is_fresh()
+
+    operation = await operation_dao.get_operation(OperationEnum.SQUARE.value)
+    assert operation.cost == 5
+
+
+@pytest.mark.anyio
+async def test_catalog_reloads_after_ttl(
+    dbsession: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that an expired catalog is loaded again."""
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.DIVISION.value, 1)
+    await operation_dao.get_operation(OperationEnum.DIVISION.value)
+
+    monkeypatch.setattr(operation_catalog, "ttl", 0)
+    assert not operation_catalog.is_fresh()
+    await operation_dao.get_operation(OperationEnum.DIVISION.value)
+    assert operation_catalog.loaded_at is not None
+
+
+@pytest.mark.anyio
+async def test_unknown_operation_is_cached(dbsession: AsyncSession) -> None:
+    """Tests that looking up an unknown type doesn't reload the catalog."""
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    await operation_dao.get_operation(OperationEnum.ADDITION.value)
+    loaded_at = operation_catalog.loaded_at
+
+    for _ in range(3):
+        with pytest.raises(Exception, match="Invalid Type"):
+            await operation_dao.get_operation(OperationEnum.RANDOM.value)
+
+    assert operation_catalog.loaded_at == loaded_at
+
+
+@pytest.mark.anyio
+async def test_unknown_operation_raises(dbsession: AsyncSession) -> None:
+    """Tests that an operation missing from the table is rejected."""
+    operation_dao = OperationDAO(dbsession)
+    with pytest.raises(Exception, match="Invalid Type"):
+        await operation_dao.get_operation(OperationEnum.RANDOM.value)
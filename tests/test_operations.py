@@ -1,5 +1,3 @@
-from unittest.mock import AsyncMock
-
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient
@@ -10,6 +8,7 @@ from arithmetic.db.dao.operation_dao import OperationDAO
 from arithmetic.db.dao.record_dao import RecordDAO
 from arithmetic.db.dao.user_dao import UserDAO
 from arithmetic.web.api.operation.schema import OperationBase, OperationEnum
+from tests.utils import RandomOrgStub
 
 
 @pytest.mark.anyio
@@ -230,28 +229,298 @@ async def test_random_string(
     fastapi_app: FastAPI,
     authenticated_client: AsyncClient,
     dbsession: AsyncSession,
-    monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     """Test performing the random operation function."""
+    url = fastapi_app.url_path_for("new_operation")
+    operation = OperationBase(type=OperationEnum.RANDOM)
+
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.RANDOM.value, 10)
 
-    # Create a mock for the httpx.AsyncClient.post method
-    async def mock_post(*args: tuple, **kwargs: dict) -> AsyncMock:
-        # Create a mock response object
-        mock_response = AsyncMock()
-        mock_response.status_code = 201
-        mock_response.json.return_value = {
-            "result": {"random": {"data": ["mocked_random_string"]}},
-        }
-        return mock_response
+    response = await authenticated_client.post(url, json=operation.model_dump())
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == f"{0:032d}"
 
-    # Apply the monkeypatch to replace the post method with the mock
-    monkeypatch.setattr(AsyncClient, "post", mock_post)
+    user = await UserDAO(dbsession).get_user_by_id(with_user_id)
+    assert user.balance == (100 - 10)
 
+
+@pytest.mark.anyio
+async def test_operation_without_enough_balance(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+) -> None:
+    """Test that an operation the user can't afford is neither billed nor saved."""
+    url = fastapi_app.url_path_for("new_operation")
+    operation = OperationBase(type=OperationEnum.ADDITION, first_term=1, second_term=2)
+    dao = RecordDAO(dbsession)
+    user_dao = UserDAO(dbsession)
+
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 101)
+
+    response = await authenticated_client.post(url, json=operation.model_dump())
+    assert response.status_code == status.HTTP_402_PAYMENT_REQUIRED
+
+    records = await dao.get_all_records(user_id=with_user_id, limit=1, offset=0)
+    user = await user_dao.get_user_by_id(with_user_id)
+    assert records.total_count == 0
+    assert user.balance == 100
+
+
+@pytest.mark.anyio
+async def test_unaffordable_operation_is_not_computed(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+    random_org_stub: RandomOrgStub,
+) -> None:
+    """Test that the user is debited before random.org is called."""
     url = fastapi_app.url_path_for("new_operation")
     operation = OperationBase(type=OperationEnum.RANDOM)
 
     operation_dao = OperationDAO(dbsession)
-    await operation_dao.add_new_operation(OperationEnum.RANDOM.value, 10)
+    await operation_dao.add_new_operation(OperationEnum.RANDOM.value, 101)
+
+    response = await authenticated_client.post(url, json=operation.model_dump())
+    assert response.status_code == status.HTTP_402_PAYMENT_REQUIRED
+    assert random_org_stub.calls == []
+
+
+@pytest.mark.anyio
+async def test_debit_balance(
+    with_user_id: int,
+    dbsession: AsyncSession,
+) -> None:
+    """Test that a debit only happens when the balance covers it."""
+    user_dao = UserDAO(dbsession)
+
+    assert await user_dao.debit_balance(with_user_id, 60) == 40
+    assert await user_dao.debit_balance(with_user_id, 60) is None
+    assert await user_dao.debit_balance(with_user_id, 40) == 0
+
+
+@pytest.mark.anyio
+async def test_batch_operations(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+) -> None:
+    """Test performing several operations billed in one transaction."""
+    url = fastapi_app.url_path_for("new_operations")
+    operations = [
+        OperationBase(type=OperationEnum.ADDITION, first_term=1, second_term=2),
+        OperationBase(type=OperationEnum.MULTIPLICATION, first_term=3, second_term=2),
+        OperationBase(type=OperationEnum.ADDITION, first_term=5, second_term=5),
+    ]
+    dao = RecordDAO(dbsession)
+    user_dao = UserDAO(dbsession)
+
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.MULTIPLICATION.value, 2)
+
+    response = await authenticated_client.post(
+        url,
+        json=[operation.model_dump() for operation in operations],
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [
+        (result["result"], result["cost"], result["user_balance"])
+        for result in response.json()
+    ] == [("3", 1, 99), ("6", 2, 97), ("10", 1, 96)]
+
+    records = await dao.get_all_records(user_id=with_user_id, limit=10, offset=0)
+    user = await user_dao.get_user_by_id(with_user_id)
+    assert records.total_count == 3
+    assert sorted(record.user_balance for record in records.records) == [96, 97, 99]
+    assert user.balance == 96
+    assert user.record_count == 3
+
+
+@pytest.mark.anyio
+async def test_batch_operations_without_enough_balance(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+) -> None:
+    """Test that a batch the user can't afford is rejected as a whole."""
+    url = fastapi_app.url_path_for("new_operations")
+    operation = OperationBase(type=OperationEnum.ADDITION, first_term=1, second_term=2)
+    dao = RecordDAO(dbsession)
+    user_dao = UserDAO(dbsession)
+
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 40)
+
+    response = await authenticated_client.post(
+        url,
+        json=[operation.model_dump()] * 3,
+    )
+    assert response.status_code == status.HTTP_402_PAYMENT_REQUIRED
+
+    records = await dao.get_all_records(user_id=with_user_id, limit=1, offset=0)
+    user = await user_dao.get_user_by_id(with_user_id)
+    assert records.total_count == 0
+    assert user.balance == 100
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "payload",
+    [
+        [],
+        [
+            {"type": "addition", "first_term": 1, "second_term": 2},
+            {"type": "division", "first_term": 4, "second_term": 0},
+        ],
+        [
+            {"type": "addition", "first_term": 1, "second_term": 2},
+            {"type": "expression", "expression": "1 / (a - a)", "variables": {"a": 1}},
+        ],
+    ],
+)
+async def test_invalid_batch_operations(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+    payload: list,
+) -> None:
+    """Test that a batch with an invalid operation is rejected as a whole."""
+    url = fastapi_app.url_path_for("new_operations")
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.DIVISION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.SUBTRACTION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.EXPRESSION.value, 1)
+
+    response = await authenticated_client.post(url, json=payload)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    records = await RecordDAO(dbsession).get_all_records(
+        user_id=with_user_id,
+        limit=1,
+        offset=0,
+    )
+    user = await UserDAO(dbsession).get_user_by_id(with_user_id)
+    assert records.total_count == 0
+    assert user.balance == 100
+    assert user.record_count == 0
+
+
+@pytest.mark.anyio
+async def test_expression_operation(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+) -> None:
+    """Test that an expression is billed per node and recorded once."""
+    url = fastapi_app.url_path_for("new_operation")
+    operation = OperationBase(
+        type=OperationEnum.EXPRESSION,
+        expression="(a + b) * sqrt(c)",
+        variables={"a": 1, "b": 2, "c": 16},
+    )
+    dao = RecordDAO(dbsession)
+    user_dao = UserDAO(dbsession)
+
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.EXPRESSION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.MULTIPLICATION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.SQUARE.value, 5)
+
+    response = await authenticated_client.post(url, json=operation.model_dump())
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == "12.0"
+
+    records = await dao.get_all_records(user_id=with_user_id, limit=1, offset=0)
+    user = await user_dao.get_user_by_id(with_user_id)
+    assert records.total_count == 1
+    assert records.records[0].operation_text == "(a+b)*sqrt(c) [a=1, b=2, c=16]"
+    assert records.records[0].amount == 1 + 1 + 1 + 5
+    assert user.balance == 100 - 8
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"type": "expression"},
+        {"type": "expression", "expression": "1 +"},
+        {"type": "expression", "expression": "a + 1"},
+        {"type": "expression", "expression": "1 + 1", "first_term": 1},
+        {"type": "addition", "first_term": 1, "second_term": 2, "expression": "1"},
+        {"type": "expression", "expression": "1 / (a - a)", "variables": {"a": 1}},
+    ],
+)
+async def test_invalid_expression_operation(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+    payload: dict,
+) -> None:
+    """Test that invalid expressions are rejected without billing the user."""
+    url = fastapi_app.url_path_for("new_operation")
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.EXPRESSION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.SUBTRACTION.value, 1)
+    await operation_dao.add_new_operation(OperationEnum.DIVISION.value, 1)
+
+    response = await authenticated_client.post(url, json=payload)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    user = await UserDAO(dbsession).get_user_by_id(with_user_id)
+    assert user.balance == 100
+
+
+@pytest.mark.anyio
+async def test_large_operands(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+) -> None:
+    """Test that large operands are computed off the event loop."""
+    url = fastapi_app.url_path_for("new_operation")
+    term = 10**3999 - 1
+    operation = OperationBase(
+        type=OperationEnum.MULTIPLICATION,
+        first_term=term,
+        second_term=term,
+    )
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.MULTIPLICATION.value, 1)
 
     response = await authenticated_client.post(url, json=operation.model_dump())
     assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == "9" * 3998 + "8" + "0" * 3998 + "1"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"type": "addition", "first_term": 10**4000, "second_term": 1},
+        {"type": "expression", "expression": "a", "variables": {"a": -(10**4000)}},
+    ],
+)
+async def test_operands_too_large(
+    fastapi_app: FastAPI,
+    with_user_id: int | None,
+    authenticated_client: AsyncClient,
+    payload: dict,
+) -> None:
+    """Test that operands with too many digits are rejected."""
+    url = fastapi_app.url_path_for("new_operation")
+
+    response = await authenticated_client.post(url, json=payload)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from starlette import status
+
+from arithmetic.services.profiler import StackSampler
+from arithmetic.settings import settings
+from arithmetic.web.application import get_app
+from arithmetic.web.middleware import ProfilerMiddleware
+
+TOKEN = "profiler-secret"  # noqa: S105
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        pass
+
+
+@pytest.fixture
+def profiled_app(monkeypatch: pytest.MonkeyPatch) -> FastAPI:
+    """
+    Application built with the profiler enabled.
+
+    :return: fastapi app.
+    """
+    monkeypatch.setattr(settings, "profiler_token", TOKEN)
+    return get_app()
+
+
+def test_sampler_collapses_stacks() -> None:
+    """Tests that the stacks of the watched thread are counted."""
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,))
+    worker.start()
+    sampler = StackSampler(interval=0.001, thread_ids=[worker.ident or 0])
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    lines = sampler.collapsed().splitlines()
+    assert sampler.samples > 0
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.startswith("_bootstrap (")
+    assert int(count) > 0
+    # Only the watched thread was sampled
+    assert all(";_spin (" in line for line in lines)
+
+
+def test_profiler_disabled_by_default() -> None:
+    """Tests that no middleware is installed while profiling is disabled."""
+    app = get_app()
+
+    assert ProfilerMiddleware not in [
+        middleware.cls for middleware in app.user_middleware
+    ]
+
+
+@pytest.mark.anyio
+async def test_profile_endpoint_disabled(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+) -> None:
+    """Tests that the endpoint looks absent while profiling is disabled."""
+    url = fastapi_app.url_path_for("profile_worker")
+    response = await client.get(url, params={"seconds": 0.01})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_profile_endpoint(profiled_app: FastAPI) -> None:
+    """Tests that holders of the token get the collapsed stacks of the worker."""
+    url = profiled_app.url_path_for("profile_worker")
+    async with AsyncClient(
+        transport=ASGITransport(app=profiled_app),
+        base_url="http://test",
+    ) as client:
+        forbidden = await client.get(
+            url,
+            params={"seconds": 0.05},
+            headers={"X-Profiler-Token": "wrong"},
+        )
+        too_long = await client.get(
+            url,
+            params={"seconds": settings.profiler_max_seconds + 1},
+            headers={"X-Profiler-Token": TOKEN},
+        )
+        response = await client.get(
+            url,
+            params={"seconds": 0.05, "loop_only": True},
+            headers={"X-Profiler-Token": TOKEN},
+        )
+
+    assert forbidden.status_code == status.HTTP_403_FORBIDDEN
+    assert too_long.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["x-profile-samples"]) > 0
+    # The event loop waits in select while the endpoint sleeps
+    assert "_run_once (" in response.text
+
+
+@pytest.mark.anyio
+async def test_profile_request(profiled_app: FastAPI) -> None:
+    """Tests that a request sent with X-Profile is answered with its profile."""
+    url = profiled_app.url_path_for("health_check")
+    async with AsyncClient(
+        transport=ASGITransport(app=profiled_app),
+        base_url="http://test",
+    ) as client:
+        plain = await client.get(url)
+        forbidden = await client.get(url, headers={"X-Profile": "1"})
+        profiled = await client.get(
+            url,
+            headers={"X-Profile": "1", "X-Profiler-Token": TOKEN},
+        )
+
+    assert plain.status_code == status.HTTP_200_OK
+    assert "x-profiled-status" not in plain.headers
+    assert forbidden.status_code == status.HTTP_403_FORBIDDEN
+    assert profiled.status_code == status.HTTP_200_OK
+    assert profiled.headers["x-profiled-status"] == "200"
+    assert profiled.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+from starlette import status
+
+from arithmetic.services.random_service import (
+    CircuitBreaker,
+    CircuitState,
+    LocalRandomStrings,
+    RandomStringBuffer,
+    RandomStringProvider,
+    ResilientRandomStrings,
+)
+from tests.utils import RandomOrgStub
+
+
+async def _wait_until_filled(random_strings: RandomStringBuffer) -> None:
+    for _ in range(100):
+        if random_strings.strings.full():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("buffer was not refilled")
+
+
+@pytest.mark.anyio
+async def test_buffer_is_filled_in_batches(
+    random_strings: RandomStringBuffer,
+    random_org_stub: RandomOrgStub,
+) -> None:
+    """Tests that the buffer asks for strings in batches up to the high watermark."""
+    random_strings.start()
+    await _wait_until_filled(random_strings)
+
+    assert random_org_stub.calls == [10, 10]
+    assert await random_strings.get() == f"{0:032d}"
+
+
+@pytest.mark.anyio
+async def test_buffer_is_refilled_at_low_watermark(
+    random_strings: RandomStringBuffer,
+    random_org_stub: RandomOrgStub,
+) -> None:
+    """Tests that dropping to the low watermark triggers a refill."""
+    random_strings.start()
+    await _wait_until_filled(random_strings)
+
+    strings = [await random_strings.get() for _ in range(18)]
+    await _wait_until_filled(random_strings)
+
+    assert len(set(strings)) == 18
+    assert random_org_stub.calls == [10, 10, 10, 8]
+
+
+@pytest.mark.anyio
+async def test_empty_buffer_fetches_directly(
+    random_strings: RandomStringBuffer,
+    random_org_stub: RandomOrgStub,
+) -> None:
+    """Tests that an empty buffer falls back to a single-string call."""
+    assert await random_strings.get() == f"{0:032d}"
+    assert random_org_stub.calls == [1]
+
+
+@pytest.mark.anyio
+async def test_random_org_errors_are_raised(
+    random_strings: RandomStringBuffer,
+    random_org_stub: RandomOrgStub,
+) -> None:
+    """Tests that an error answer from random.org is surfaced."""
+    random_org_stub.error = True
+    with pytest.raises(Exception, match="Error fetching string"):
+        await random_strings.get()
+
+
+class SlowRandomStrings(RandomStringProvider):
+    """Provider that never answers in time."""
+
+    async def get(self) -> str:
+        """Waits forever."""
+        await asyncio.Event().wait()
+        return ""
+
+
+@pytest.mark.anyio
+async def test_timeouts_fall_back_to_local_strings() -> None:
+    """Tests that a hanging upstream is cut by the timeout."""
+    random_strings = ResilientRandomStrings(
+        SlowRandomStrings(),
+        fallback=LocalRandomStrings(),
+        timeout=0.01,
+    )
+
+    string = await random_strings.get()
+
+    assert len(string) == 32
+    assert random_strings.breaker.failures == 1
+
+
+@pytest.mark.anyio
+async def test_breaker_opens_and_recovers(
+    random_strings: RandomStringBuffer,
+    random_org_stub: RandomOrgStub,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests the closed, open and half-open states of the breaker."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    resilient = ResilientRandomStrings(
+        random_strings,
+        fallback=LocalRandomStrings(),
+        breaker=breaker,
+    )
+    random_org_stub.error = True
+
+    await resilient.get()
+    assert breaker.state == CircuitState.CLOSED
+    await resilient.get()
+    assert breaker.state == CircuitState.OPEN
+
+    await resilient.get()
+    assert random_org_stub.calls == [1, 1]
+
+    monkeypatch.setattr(breaker, "opened_at", time.monotonic() - 31)
+    assert breaker.state == CircuitState.HALF_OPEN
+    random_org_stub.error = False
+    assert await resilient.get() == f"{0:032d}"
+    assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.mark.anyio
+async def test_cancelled_trial_lets_the_next_call_through(
+    random_strings: RandomStringBuffer,
+    random_org_stub: RandomOrgStub,
+) -> None:
+    """Tests that cancelling the half-open trial doesn't keep the breaker stuck."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.HALF_OPEN
+    trial = asyncio.ensure_future(
+        ResilientRandomStrings(SlowRandomStrings(), breaker=breaker).get(),
+    )
+    await asyncio.sleep(0)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert not breaker.trial_running
+    resilient = ResilientRandomStrings(random_strings, breaker=breaker)
+    assert await resilient.get() == f"{0:032d}"
+    assert breaker.state == CircuitState.CLOSED
+    assert random_org_stub.calls == [1]
+
+
+@pytest.mark.anyio
+async def test_open_breaker_without_fallback_is_unavailable() -> None:
+    """Tests that an open breaker without fallback answers 503."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    random_strings = ResilientRandomStrings(SlowRandomStrings(), breaker=breaker)
+
+    with pytest.raises(HTTPException) as error:
+        await random_strings.get()
+
+    assert error.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.mark.anyio
+async def test_random_provider_status(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+) -> None:
+    """Tests that the breaker state is exposed by the monitoring router."""
+    url = fastapi_app.url_path_for("random_provider_status")
+    response = await client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "state": "closed",
+        "failures": 0,
+        "fallback_enabled": True,
+    }
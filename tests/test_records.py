@@ -0,0 +1,349 @@
+import csv
+import json
+from datetime import datetime, timedelta
+from typing import Any, List, Tuple
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette import status
+
+from arithmetic.db.dao.operation_dao import OperationDAO
+from arithmetic.db.dao.record_dao import RecordDAO
+from arithmetic.db.dao.record_response import CountMode
+from arithmetic.db.dao.user_dao import UserDAO
+from arithmetic.db.models.record_model import RecordModel
+from arithmetic.services.record_export_service import RecordExportService
+from arithmetic.settings import settings
+from arithmetic.web.api.operation.schema import ExportFormat, OperationEnum
+
+
+@pytest.fixture
+async def record_ids(with_user_id: int, dbsession: AsyncSession) -> List[int]:
+    """
+    Create records for the test user.
+
+    Two of them share the same date, to check ties are ordered by id.
+
+    :return: ids of the records, newest first.
+    """
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    operation = await operation_dao.get_operation(OperationEnum.ADDITION.value)
+
+    start = datetime(2024, 1, 1)
+    dates = [start, start + timedelta(days=1), start + timedelta(days=1)]
+    dates += [start + timedelta(days=days) for days in range(2, 7)]
+    records = [
+        RecordModel(
+            user_id=with_user_id,
+            operation_id=operation.id,
+            amount=1,
+            user_balance=100 - number,
+            operation_response=str(number),
+            operation_text=f"{number}+0",
+            date=date,
+        )
+        for number, date in enumerate(dates)
+    ]
+    dbsession.add_all(records)
+    await dbsession.flush()
+    return [record.id for record in reversed(records)]
+
+
+@pytest.mark.anyio
+async def test_records_cursor_pagination(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    record_ids: List[int],
+) -> None:
+    """Tests that following next_cursor walks every record once, newest first."""
+    url = fastapi_app.url_path_for("get_records")
+    seen: List[int] = []
+    params: dict[str, object] = {"limit": 3}
+
+    while True:
+        response = await authenticated_client.get(url, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        seen += [record["id"] for record in page["records"]]
+        if page["next_cursor"] is None:
+            break
+        params = {"limit": 3, "cursor": page["next_cursor"]}
+
+    assert seen == record_ids
+
+
+@pytest.mark.anyio
+async def test_records_offset_pagination(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    record_ids: List[int],
+) -> None:
+    """Tests that limit/offset keeps working with the same ordering."""
+    url = fastapi_app.url_path_for("get_records")
+    response = await authenticated_client.get(
+        url,
+        params={"limit": 3, "offset": 3, "count": "exact"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert [record["id"] for record in page["records"]] == record_ids[3:6]
+    assert page["total_count"] == len(record_ids)
+    assert page["next_cursor"] is not None
+
+
+@pytest.mark.anyio
+async def test_records_fields(
+    fastapi_app: FastAPI,
+    with_user_id: int,
+    authenticated_client: AsyncClient,
+    record_ids: List[int],
+) -> None:
+    """Tests the fields of a listed record, with the date formatted by SQL."""
+    url = fastapi_app.url_path_for("get_records")
+    response = await authenticated_client.get(url, params={"limit": 1})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["records"] == [
+        {
+            "id": record_ids[0],
+            "user_id": with_user_id,
+            "amount": 1,
+            "user_balance": 93,
+            "operation_response": "7",
+            "operation_text": "7+0",
+            "date": "2024-01-07",
+        },
+    ]
+
+
+@pytest.mark.anyio
+async def test_records_gzip(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    record_ids: List[int],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that pages over the threshold are gzipped when the client accepts it."""
+    monkeypatch.setattr(settings, "response_gzip_min_size", 500)
+    url = fastapi_app.url_path_for("get_records")
+
+    small = await authenticated_client.get(url, params={"limit": 1})
+    large = await authenticated_client.get(url, params={"limit": 8})
+    identity = await authenticated_client.get(
+        url,
+        params={"limit": 8},
+        headers={"Accept-Encoding": "identity"},
+    )
+
+    assert "content-encoding" not in small.headers
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in identity.headers
+    assert large.json() == identity.json()
+    assert [record["id"] for record in large.json()["records"]] == record_ids
+
+
+@pytest.mark.anyio
+async def test_records_invalid_cursor(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+) -> None:
+    """Tests that a malformed cursor is rejected."""
+    url = fastapi_app.url_path_for("get_records")
+    response = await authenticated_client.get(url, params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_record_counter_follows_writes(
+    fastapi_app: FastAPI,
+    with_user_id: int,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+) -> None:
+    """Tests that the record counter is kept in step with creations and deletes."""
+    operation_dao = OperationDAO(dbsession)
+    await operation_dao.add_new_operation(OperationEnum.ADDITION.value, 1)
+    url = fastapi_app.url_path_for("new_operation")
+    for _ in range(3):
+        await authenticated_client.post(
+            url,
+            json={"type": "addition", "first_term": 1, "second_term": 1},
+        )
+
+    dao = RecordDAO(dbsession)
+    records = await dao.get_all_records(with_user_id, limit=1, offset=0)
+    await dao.delete_record(records.records[0].id)
+    await dao.delete_record(records.records[0].id)
+
+    assert await dao.count_records(with_user_id, CountMode.ESTIMATE) == 2
+    assert await dao.count_records(with_user_id, CountMode.EXACT) == 2
+
+
+@pytest.mark.anyio
+async def test_records_without_count(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    record_ids: List[int],
+) -> None:
+    """Tests that count=none skips the total count."""
+    url = fastapi_app.url_path_for("get_records")
+    response = await authenticated_client.get(url, params={"count": "none"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["total_count"] is None
+    assert len(response.json()["records"]) == 8
+
+
+@pytest.mark.anyio
+async def test_search_is_scoped_to_user(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+    record_ids: List[int],
+) -> None:
+    """Tests that search only returns records of the calling user."""
+    user_dao = UserDAO(dbsession)
+    await user_dao.create_user("otherUser", "Asdf!1234")
+    other_user = await user_dao.get_user("otherUser")
+    operation = await OperationDAO(dbsession).get_operation(
+        OperationEnum.ADDITION.value,
+    )
+    dbsession.add(
+        RecordModel(
+            user_id=other_user.id,  # type: ignore[union-attr]
+            operation_id=operation.id,
+            amount=1,
+            user_balance=99,
+            operation_response="3",
+            operation_text="3+0",
+        ),
+    )
+    await dbsession.flush()
+
+    url = fastapi_app.url_path_for("search_records", term="3+")
+    response = await authenticated_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [record["id"] for record in response.json()] == [record_ids[-4]]
+
+
+@pytest.mark.anyio
+async def test_search_matches_term_literally(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    record_ids: List[int],
+) -> None:
+    """Tests that LIKE wildcards in the term are not interpreted."""
+    url = fastapi_app.url_path_for("search_records", term="%")
+    response = await authenticated_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+
+@pytest.mark.anyio
+async def test_export_ndjson(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    dbsession: AsyncSession,
+    record_ids: List[int],
+) -> None:
+    """Tests that the export streams every live record, newest first."""
+    await RecordDAO(dbsession).delete_record(record_ids[0])
+    url = fastapi_app.url_path_for("export_records")
+    response = await authenticated_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["id"] for record in records] == record_ids[1:]
+    assert records[-1]["operation_text"] == "0+0"
+    assert records[-1]["date"] == "2024-01-01T00:00:00"
+
+
+@pytest.mark.anyio
+async def test_export_csv(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    record_ids: List[int],
+) -> None:
+    """Tests that the CSV export has a header and a row per record."""
+    url = fastapi_app.url_path_for("export_records")
+    response = await authenticated_client.get(url, params={"format": "csv"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert [int(row["id"]) for row in rows] == record_ids
+    assert rows[0]["user_balance"] == "93"
+
+
+@pytest.mark.anyio
+async def test_export_is_read_in_batches(
+    with_user_id: int,
+    dbsession: AsyncSession,
+    record_ids: List[int],
+) -> None:
+    """Tests that records are read and encoded a batch at a time."""
+    service = RecordExportService(
+        async_sessionmaker(dbsession.bind, expire_on_commit=False),
+    )
+
+    chunks = [
+        chunk async for chunk in service.export(with_user_id, ExportFormat.NDJSON, 3)
+    ]
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [3, 3, 2]
+
+
+@pytest.mark.anyio
+async def test_record_queries_use_live_records_index(
+    with_user_id: int,
+    dbsession: AsyncSession,
+    record_ids: List[int],
+) -> None:
+    """
+    Tests that the RecordDAO hot queries are planned on the partial index.
+
+    Every SELECT the DAO sends is captured and run again under EXPLAIN ANALYZE.
+    Sequential scans are disabled so the tiny test table doesn't hide
+    whether the index is usable.
+    """
+    connection = await dbsession.connection()
+    statements: List[Tuple[str, Any]] = []
+
+    def capture(*args: Any) -> None:
+        statement, parameters = args[2], args[3]
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    dao = RecordDAO(dbsession)
+    event.listen(connection.sync_connection, "before_cursor_execute", capture)
+    try:
+        page = await dao.get_all_records(with_user_id, limit=3, offset=0)
+        last = page.records[-1]
+        await dao.get_all_records(
+            with_user_id,
+            limit=3,
+            offset=0,
+            after=(last.timestamp, last.id),
+        )
+        await dao.search(with_user_id, "+", limit=3, offset=0)
+    finally:
+        event.remove(connection.sync_connection, "before_cursor_execute", capture)
+
+    await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    assert len(statements) == 5
+    for statement, parameters in statements:
+        plan = await connection.exec_driver_sql(
+            f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}",
+            parameters,
+        )
+        assert "ix_records_user_date_live" in json.dumps(plan.scalar()), statement
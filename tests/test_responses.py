@@ -0,0 +1,21 @@
+import pytest
+
+from arithmetic.web.responses import accepts_gzip
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, GZIP;q=0.5", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip;q=0.0, *", False),
+        ("deflate, br", False),
+        ("identity", False),
+        ("", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str, expected: bool) -> None:
+    """Tests the parsing of the Accept-Encoding header."""
+    assert accepts_gzip(accept_encoding) is expected
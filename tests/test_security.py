@@ -0,0 +1,108 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from arithmetic.services.security_service import (
+    VerifiedTokenCache,
+    get_current_user,
+    token_cache,
+)
+from arithmetic.services.security_utils import create_access_token
+from arithmetic.web.api.auth.schema import ValidatedUser
+
+
+@pytest.fixture(autouse=True)
+def _clear_token_cache() -> None:
+    token_cache.clear()
+    token_cache.revoked.clear()
+    token_cache.hits = token_cache.misses = 0
+
+
+@pytest.mark.anyio
+async def test_verified_tokens_are_cached() -> None:
+    """Test that a token is only decoded the first time it is seen."""
+    token = await create_access_token("testUser", 7, 100, timedelta(minutes=20))
+
+    first = await get_current_user(token)
+    second = await get_current_user(token)
+
+    assert first == second == ValidatedUser(user_id=7, username="testUser")
+    assert (token_cache.hits, token_cache.misses) == (1, 1)
+
+
+@pytest.mark.anyio
+async def test_invalid_tokens_are_not_cached() -> None:
+    """Test that tokens that fail verification never reach the cache."""
+    token = await create_access_token("testUser", 7, 100, timedelta(minutes=-1))
+
+    with pytest.raises(HTTPException):
+        await get_current_user(token)
+    with pytest.raises(HTTPException):
+        await get_current_user(token + "x")
+    assert len(token_cache) == 0
+
+
+def test_expired_entries() -> None:
+    """Test that entries are dropped once their token expires."""
+    cache = VerifiedTokenCache(max_size=10)
+    user = ValidatedUser(user_id=7, username="testUser")
+    cache.put("expired", user, time.time() - 1)
+    cache.put("valid", user, time.time() + 60)
+
+    assert cache.get("expired") is None
+    assert cache.get("valid") == user
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    """Test that the cache never grows past its size."""
+    cache = VerifiedTokenCache(max_size=2)
+    expires_at = time.time() + 60
+    for user_id in range(3):
+        if user_id == 2:
+            cache.get("0")
+        cache.put(
+            str(user_id),
+            ValidatedUser(user_id=user_id, username="testUser"),
+            expires_at,
+        )
+
+    assert cache.get("0") is not None
+    assert cache.get("1") is None
+    assert cache.get("2") is not None
+
+
+@pytest.mark.anyio
+async def test_revoked_tokens_are_rejected() -> None:
+    """Test that a revoked token is rejected even though it was cached."""
+    token = await create_access_token("testUser", 7, 100, timedelta(minutes=20))
+    other = await create_access_token("otherUser", 8, 100, timedelta(minutes=20))
+    await get_current_user(token)
+
+    token_cache.revoke(token)
+
+    assert len(token_cache) == 0
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await get_current_user(token)
+    assert await get_current_user(other) == ValidatedUser(
+        user_id=8,
+        username="otherUser",
+    )
+
+
+@pytest.mark.anyio
+async def test_revocations_expire_with_their_token() -> None:
+    """Test that revocations are only kept until their token expires."""
+    cache = VerifiedTokenCache(max_size=10)
+    token = await create_access_token("testUser", 7, 100, timedelta(minutes=20))
+    cache.revoked[b"expired"] = time.time() - 1
+
+    cache.revoke(token)
+    cache.revoke("not a token")
+
+    assert cache.is_revoked(token)
+    assert not cache.is_revoked("not a token")
+    assert list(cache.revoked.values()) == [pytest.approx(time.time() + 1200, abs=5)]
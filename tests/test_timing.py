@@ -0,0 +1,117 @@
+import json
+import logging
+from typing import Dict
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from arithmetic.db.dao.operation_dao import OperationDAO
+from arithmetic.settings import settings
+from arithmetic.timing import (
+    Span,
+    format_server_timing,
+    record_timing,
+    request_timings,
+)
+from arithmetic.web.api.operation.schema import OperationEnum
+
+
+def _server_timing(header: str) -> Dict[str, float]:
+    timings = {}
+    for metric in header.split(", "):
+        name, duration = metric.split(";dur=")
+        timings[name] = float(duration)
+    return timings
+
+
+@pytest.fixture
+async def addition(dbsession: AsyncSession) -> None:
+    """Adds the addition operation to the catalog."""
+    await OperationDAO(dbsession).add_new_operation(OperationEnum.ADDITION.value, 1)
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("addition")
+async def test_operation_server_timing(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+) -> None:
+    """Tests that every phase of an operation is in the Server-Timing header."""
+    url = fastapi_app.url_path_for("new_operation")
+    response = await authenticated_client.post(
+        url,
+        json={"type": "addition", "first_term": 1, "second_term": 2},
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    timings = _server_timing(response.headers["server-timing"])
+    assert set(timings) == {
+        "jwt",
+        "lock",
+        "catalog",
+        "compute",
+        "commit",
+        "db",
+        "total",
+    }
+    assert timings["total"] >= timings["commit"] >= 0
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("addition")
+async def test_server_timing_log(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Tests that timings are logged as JSON when enabled."""
+    monkeypatch.setattr(settings, "server_timing_log", True)
+    url = fastapi_app.url_path_for("new_operation")
+    with caplog.at_level(logging.INFO, logger="arithmetic.web.middleware"):
+        await authenticated_client.post(
+            url,
+            json={"type": "addition", "first_term": 1, "second_term": 2},
+        )
+
+    line = json.loads(caplog.records[-1].getMessage().removeprefix("Server timing "))
+    assert line["method"] == "POST"
+    assert line["route"] == "/api/operation/"
+    assert line["status"] == status.HTTP_201_CREATED
+    assert "commit" in line["timings"]
+
+
+@pytest.mark.anyio
+async def test_server_timing_disabled(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that the header can be turned off."""
+    monkeypatch.setattr(settings, "server_timing", False)
+    response = await client.get(fastapi_app.url_path_for("health_check"))
+
+    assert "server-timing" not in response.headers
+
+
+def test_timings_add_up() -> None:
+    """Tests that timings of one phase add up, and are dropped outside a request."""
+    with Span("ignored"):
+        pass
+
+    timings: Dict[str, float] = {}
+    reset_token = request_timings.set(timings)
+    try:
+        record_timing("db", 0.5)
+        record_timing("db", 0.25)
+        with Span("compute"):
+            pass
+    finally:
+        request_timings.reset(reset_token)
+
+    assert list(timings) == ["db", "compute"]
+    assert timings["db"] == 0.75
+    assert format_server_timing({"db": 0.0012345}) == "db;dur=1.234"
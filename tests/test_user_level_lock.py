@@ -0,0 +1,98 @@
+import asyncio
+from typing import List
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from arithmetic.services.user_level_lock import AdvisoryUserLock, InProcessUserLock
+
+
+@pytest.mark.anyio
+async def test_in_process_lock_serializes_same_user() -> None:
+    """Tests that operations of one user never overlap."""
+    user_lock = InProcessUserLock()
+    events: List[str] = []
+
+    async def operation(name: str) -> None:
+        async with user_lock.hold(1):
+            events.append(f"{name}-start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name}-end")
+
+    await asyncio.gather(operation("a"), operation("b"))
+
+    assert events == ["a-start", "a-end", "b-start", "b-end"]
+    assert len(user_lock) == 0
+
+
+@pytest.mark.anyio
+async def test_in_process_lock_is_released_on_error() -> None:
+    """Tests that a failing operation doesn't leave the user locked."""
+    user_lock = InProcessUserLock()
+
+    with pytest.raises(ValueError, match="boom"):
+        async with user_lock.hold(1):
+            raise ValueError("boom")
+
+    assert len(user_lock) == 0
+    async with user_lock.hold(1):
+        pass
+
+
+@pytest.mark.anyio
+async def test_advisory_lock_is_held_until_commit(_engine: AsyncEngine) -> None:
+    """Tests that the advisory lock blocks other connections until commit."""
+    try_lock = select(func.pg_try_advisory_xact_lock(42))
+    async with AsyncSession(_engine) as holder, AsyncSession(_engine) as other:
+        async with AdvisoryUserLock(holder).hold(42):
+            assert (await other.execute(try_lock)).scalar() is False
+            await other.rollback()
+
+        await holder.commit()
+        assert (await other.execute(try_lock)).scalar() is True
+        await other.rollback()
+
+
+@pytest.mark.anyio
+async def test_in_process_lock_is_released_on_cancel() -> None:
+    """Tests that a cancelled waiter doesn't leak its lock entry."""
+    user_lock = InProcessUserLock(shards=4)
+
+    async def wait_for_lock() -> None:
+        async with user_lock.hold(7):
+            pass
+
+    async with user_lock.hold(7):
+        waiter = asyncio.ensure_future(wait_for_lock())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    assert len(user_lock) == 0
+
+
+@pytest.mark.anyio
+async def test_in_process_lock_memory_is_bounded() -> None:
+    """Tests that distinct users don't accumulate lock entries."""
+    user_lock = InProcessUserLock(shards=8)
+
+    for user_id in range(10_000):
+        async with user_lock.hold(user_id):
+            assert len(user_lock) == 1
+
+    assert len(user_lock) == 0
+
+
+@pytest.mark.anyio
+async def test_in_process_lock_not_entered_holds_nothing() -> None:
+    """Tests that a hold context never entered doesn't leak its lock entry."""
+    user_lock = InProcessUserLock(shards=4)
+
+    user_lock.hold(3)
+    assert len(user_lock) == 0
+
+    async with user_lock.hold(3):
+        assert len(user_lock) == 1
+    assert len(user_lock) == 0
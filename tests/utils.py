@@ -0,0 +1,29 @@
+"""Helpers shared by the tests."""
+
+from typing import List
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+
+class RandomOrgStub:
+    """Local stand-in for the random.org JSON-RPC API."""
+
+    def __init__(self) -> None:
+        self.calls: List[int] = []
+        self.generated = 0
+        self.error = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Answers a generateStrings call."""
+        payload = await Request(scope, receive).json()
+        n = payload["params"]["n"]
+        self.calls.append(n)
+        if self.error:
+            body = {"jsonrpc": "2.0", "error": {"message": "down"}, "id": 42}
+        else:
+            data = [f"{self.generated + i:032d}" for i in range(n)]
+            self.generated += n
+            body = {"jsonrpc": "2.0", "result": {"random": {"data": data}}, "id": 42}
+        await JSONResponse(body)(scope, receive, send)